@@ -1,41 +1,31 @@
 import json
-import matplotlib.pyplot as plt
 import sys
 import numpy as np
 import copy
 
 #import helper
 
-import mea_11_jitter.analyze
-import mea_12_xor_dpsk_10s.analyze
-import mea_13_xor_dpsk_20ms.analyze
-import mea_14_xor_dpsk_30ms.analyze
-import mea_15_xor_dpsk_40ms.analyze
-import mea_16_xor_dpsk_50ms.analyze
-import mea_17_xor_dpsk_60ms.analyze
-import mea_18_xor_dpsk_70ms.analyze
-import mea_19_xor_dpsk_100ms.analyze
-import mea_20_xor_dpsk_nojumpback_100ms.analyze
-import mea_21_xor_dpsk_nojumpback_50ms.analyze
-import mea_22_xor_8bit.analyze
-import mea_24_xor_2bit.analyze
-import mea_25_xor_4bit.analyze
+import runner
 
 # Ignore NONE in list
 import warnings
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
-def getPacketLosses():
+DPSK_MEASUREMENTS = [
+    "mea_11_jitter",
+    "mea_12_xor_dpsk_10s",
+    "mea_13_xor_dpsk_20ms",
+    "mea_14_xor_dpsk_30ms",
+    "mea_15_xor_dpsk_40ms",
+    "mea_16_xor_dpsk_50ms",
+    "mea_17_xor_dpsk_60ms",
+    "mea_18_xor_dpsk_70ms",
+    "mea_19_xor_dpsk_100ms",
+]
 
-    mea_11 = mea_11_jitter.analyze.analyze(mea_11_jitter.analyze.readMeasurements("mea_11_jitter/out.json"))
-    mea_12 = mea_12_xor_dpsk_10s.analyze.analyze(mea_12_xor_dpsk_10s.analyze.readMeasurements("mea_12_xor_dpsk_10s/out.json"))
-    mea_13 = mea_13_xor_dpsk_20ms.analyze.analyze(mea_13_xor_dpsk_20ms.analyze.readMeasurements("mea_13_xor_dpsk_20ms/out.json"))
-    mea_14 = mea_14_xor_dpsk_30ms.analyze.analyze(mea_14_xor_dpsk_30ms.analyze.readMeasurements("mea_14_xor_dpsk_30ms/out.json"))
-    mea_15 = mea_15_xor_dpsk_40ms.analyze.analyze(mea_15_xor_dpsk_40ms.analyze.readMeasurements("mea_15_xor_dpsk_40ms/out.json"))
-    mea_16 = mea_16_xor_dpsk_50ms.analyze.analyze(mea_16_xor_dpsk_50ms.analyze.readMeasurements("mea_16_xor_dpsk_50ms/out.json"))
-    mea_17 = mea_17_xor_dpsk_60ms.analyze.analyze(mea_17_xor_dpsk_60ms.analyze.readMeasurements("mea_17_xor_dpsk_60ms/out.json"))
-    mea_18 = mea_18_xor_dpsk_70ms.analyze.analyze(mea_18_xor_dpsk_70ms.analyze.readMeasurements("mea_18_xor_dpsk_70ms/out.json"))
-    mea_19 = mea_19_xor_dpsk_100ms.analyze.analyze(mea_19_xor_dpsk_100ms.analyze.readMeasurements("mea_19_xor_dpsk_100ms/out.json"))
+def getPacketLosses():
+    # Measurements are decoded in parallel, see runner.py
+    res = runner.runMeasurements(DPSK_MEASUREMENTS)
 
     packetlosses = [
         [
@@ -50,30 +40,23 @@ def getPacketLosses():
             "10s",
         ],
         [
-            (mea_11["numMsgsLost"] / len(mea_11["msgs"])) * 100,
-            (mea_13["numMsgsLost"] / len(mea_13["msgs"])) * 100,
-            (mea_14["numMsgsLost"] / len(mea_14["msgs"])) * 100,
-            (mea_15["numMsgsLost"] / len(mea_15["msgs"])) * 100,
-            (mea_16["numMsgsLost"] / len(mea_16["msgs"])) * 100,
-            (mea_17["numMsgsLost"] / len(mea_17["msgs"])) * 100,
-            (mea_18["numMsgsLost"] / len(mea_18["msgs"])) * 100,
-            (mea_19["numMsgsLost"] / len(mea_19["msgs"])) * 100,
-            (mea_12["numMsgsLost"] / len(mea_12["msgs"])) * 100,
+            res["mea_11_jitter"]["packetLoss"],
+            res["mea_13_xor_dpsk_20ms"]["packetLoss"],
+            res["mea_14_xor_dpsk_30ms"]["packetLoss"],
+            res["mea_15_xor_dpsk_40ms"]["packetLoss"],
+            res["mea_16_xor_dpsk_50ms"]["packetLoss"],
+            res["mea_17_xor_dpsk_60ms"]["packetLoss"],
+            res["mea_18_xor_dpsk_70ms"]["packetLoss"],
+            res["mea_19_xor_dpsk_100ms"]["packetLoss"],
+            res["mea_12_xor_dpsk_10s"]["packetLoss"],
         ]
     ]
 
     return packetlosses
 
 def getBER():
-    mea_11 = mea_11_jitter.analyze.analyze(mea_11_jitter.analyze.readMeasurements("mea_11_jitter/out.json"))
-    mea_12 = mea_12_xor_dpsk_10s.analyze.analyze(mea_12_xor_dpsk_10s.analyze.readMeasurements("mea_12_xor_dpsk_10s/out.json"))
-    mea_13 = mea_13_xor_dpsk_20ms.analyze.analyze(mea_13_xor_dpsk_20ms.analyze.readMeasurements("mea_13_xor_dpsk_20ms/out.json"))
-    mea_14 = mea_14_xor_dpsk_30ms.analyze.analyze(mea_14_xor_dpsk_30ms.analyze.readMeasurements("mea_14_xor_dpsk_30ms/out.json"))
-    mea_15 = mea_15_xor_dpsk_40ms.analyze.analyze(mea_15_xor_dpsk_40ms.analyze.readMeasurements("mea_15_xor_dpsk_40ms/out.json"))
-    mea_16 = mea_16_xor_dpsk_50ms.analyze.analyze(mea_16_xor_dpsk_50ms.analyze.readMeasurements("mea_16_xor_dpsk_50ms/out.json"))
-    mea_17 = mea_17_xor_dpsk_60ms.analyze.analyze(mea_17_xor_dpsk_60ms.analyze.readMeasurements("mea_17_xor_dpsk_60ms/out.json"))
-    mea_18 = mea_18_xor_dpsk_70ms.analyze.analyze(mea_18_xor_dpsk_70ms.analyze.readMeasurements("mea_18_xor_dpsk_70ms/out.json"))
-    mea_19 = mea_19_xor_dpsk_100ms.analyze.analyze(mea_19_xor_dpsk_100ms.analyze.readMeasurements("mea_19_xor_dpsk_100ms/out.json"))
+    # Measurements are decoded in parallel, see runner.py
+    res = runner.runMeasurements(DPSK_MEASUREMENTS)
 
     ber = [
         [
@@ -87,19 +70,21 @@ def getBER():
             "10s",
         ],
         [
-            (mea_13["numSymbolErrors"] / mea_13["numSymbolsPossible"]) * 100,
-            (mea_14["numSymbolErrors"] / mea_14["numSymbolsPossible"]) * 100,
-            (mea_15["numSymbolErrors"] / mea_15["numSymbolsPossible"]) * 100,
-            (mea_16["numSymbolErrors"] / mea_16["numSymbolsPossible"]) * 100,
-            (mea_17["numSymbolErrors"] / mea_17["numSymbolsPossible"]) * 100,
-            (mea_18["numSymbolErrors"] / mea_18["numSymbolsPossible"]) * 100,
-            (mea_19["numSymbolErrors"] / mea_19["numSymbolsPossible"]) * 100,
-            (mea_12["numSymbolErrors"] / mea_12["numSymbolsPossible"]) * 100,
+            res["mea_13_xor_dpsk_20ms"]["ber"],
+            res["mea_14_xor_dpsk_30ms"]["ber"],
+            res["mea_15_xor_dpsk_40ms"]["ber"],
+            res["mea_16_xor_dpsk_50ms"]["ber"],
+            res["mea_17_xor_dpsk_60ms"]["ber"],
+            res["mea_18_xor_dpsk_70ms"]["ber"],
+            res["mea_19_xor_dpsk_100ms"]["ber"],
+            res["mea_12_xor_dpsk_10s"]["ber"],
         ]
     ]
     return ber
 
 def plot():
+    import matplotlib.pyplot as plt
+
     packetloss = getPacketLosses()
     ber = getBER()
 
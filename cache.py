@@ -0,0 +1,275 @@
+import os
+import sys
+import json
+import hashlib
+import collections
+import numpy as np
+
+import helper
+import ingest
+
+# On-disk cache for parsed and decoded measurements
+# Every measurement file gets a ".cache" directory next to it. The parsed
+# gateway index and the decoded message tables are stored there as .npz files,
+# keyed by the content hash of the file and the decoder parameters, so a
+# warm run neither reads the JSON nor decodes it again.
+# Entries are also kept in memory (least recently used are dropped first
+# once MEMO_MAX_BYTES are used), so asking again in the same process does
+# not even read the .npz file. Keys include a hash of the code reading and
+# decoding the files (DECODER_FILES), entries of another version are not
+# used.
+
+CACHE_VERSION = 3
+CACHE_DIR_NAME = ".cache"
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+INDEX_FILE = "index.json"
+MEMO_MAX_BYTES = 256 * 1024 * 1024
+# Modules the cached results depend on
+DECODER_FILES = ["helper.py", "ingest.py", "store.py"]
+
+# entry -> arrays, in order of use
+_memo = collections.OrderedDict()
+_memoBytes = 0
+_decoderVersion = None
+
+def decoderVersion():
+    # Content hash of DECODER_FILES
+    global _decoderVersion
+
+    if _decoderVersion == None:
+        h = hashlib.sha1()
+        for name in DECODER_FILES:
+            with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), "rb") as f:
+                h.update(f.read())
+        _decoderVersion = h.hexdigest()
+    return _decoderVersion
+
+def _memoGet(entry):
+    if not entry in _memo:
+        return None
+    _memo.move_to_end(entry)
+
+    # Copies, the caller may change them
+    return {name: col.copy() for name, col in _memo[entry].items()}
+
+def _memoDrop(entry):
+    global _memoBytes
+
+    if entry in _memo:
+        _memoBytes -= sum(col.nbytes for col in _memo.pop(entry).values())
+
+def _memoPut(entry, arrays):
+    global _memoBytes
+
+    _memoDrop(entry)
+    _memo[entry] = {name: col.copy() for name, col in arrays.items()}
+    _memoBytes += sum(col.nbytes for col in arrays.values())
+
+    while _memoBytes > MEMO_MAX_BYTES and len(_memo) > 1:
+        _memoDrop(next(iter(_memo)))
+
+def memoClear():
+    global _memoBytes
+
+    _memo.clear()
+    _memoBytes = 0
+
+def cacheDir(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+
+def _readIndex(directory):
+    try:
+        with open(os.path.join(directory, INDEX_FILE), "r") as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+def _writeIndex(directory, index):
+    tmp = os.path.join(directory, INDEX_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(json.dumps(index))
+    os.replace(tmp, os.path.join(directory, INDEX_FILE))
+
+def fileHash(path):
+    # Content hash of a file, only rehashed if size or mtime changed
+    # A store (see store.py) is identified by its manifest, as segments
+    # are never changed
+    if os.path.isdir(path):
+        import store
+        path = os.path.join(path, store.MANIFEST_FILE)
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    directory = cacheDir(path)
+    name = os.path.basename(path)
+    st = os.stat(path)
+
+    index = _readIndex(directory)
+    entry = index.get(name)
+    if entry != None and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return entry["sha1"]
+
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+
+    os.makedirs(directory, exist_ok=True)
+    index[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": h.hexdigest()}
+    _writeIndex(directory, index)
+
+    return h.hexdigest()
+
+def _entryPath(path, kind, params):
+    key = json.dumps([CACHE_VERSION, decoderVersion(), kind, fileHash(path), params])
+    key = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return os.path.join(cacheDir(path), "{0}.{1}.{2}.npz".format(os.path.basename(path), kind, key))
+
+def _touch(entry):
+    # Mark as recently used for evict()
+    try:
+        os.utime(entry)
+    except OSError:
+        pass
+
+def _load(entry):
+    arrays = _memoGet(entry)
+    if arrays != None:
+        _touch(entry)
+        return arrays
+
+    try:
+        with np.load(entry) as f:
+            arrays = {name: f[name] for name in f.files}
+    except (OSError, ValueError):
+        return None
+
+    _touch(entry)
+    _memoPut(entry, arrays)
+    return arrays
+
+def _save(entry, arrays):
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    tmp = entry + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, entry)
+    _memoPut(entry, arrays)
+
+    evict(os.path.dirname(entry))
+
+def evict(directory, maxBytes=CACHE_MAX_BYTES):
+    # Remove least recently used entries until the cache fits into maxBytes
+    try:
+        entries = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".npz")]
+    except OSError:
+        return
+
+    entries = [[os.stat(entry).st_mtime_ns, os.stat(entry).st_size, entry] for entry in entries]
+    entries.sort()
+
+    total = sum(size for mtime, size, entry in entries)
+    for mtime, size, entry in entries:
+        if total <= maxBytes:
+            break
+        os.remove(entry)
+        total -= size
+
+def invalidate(path):
+    # Drop all cached entries of a measurement file
+    directory = cacheDir(path)
+    name = os.path.basename(path)
+
+    for entry in list(_memo):
+        if os.path.dirname(entry) == directory and os.path.basename(entry).startswith(name + "."):
+            _memoDrop(entry)
+
+    try:
+        entries = os.listdir(directory)
+    except OSError:
+        return
+
+    for entry in entries:
+        if entry.startswith(name + ".") and entry.endswith(".npz"):
+            os.remove(os.path.join(directory, entry))
+
+    index = _readIndex(directory)
+    if name in index:
+        del index[name]
+        _writeIndex(directory, index)
+
+def readGatewaysFile(path):
+    # helper.readGateways() of a measurement file, cached
+    # Stored flat as "uplinks/<column>" and "<eui>/<column>"
+    entry = _entryPath(path, "gateways", [])
+    arrays = _load(entry)
+
+    if arrays == None:
+        index = helper.readGateways(ingest.iterUplinks(path))
+        arrays = {"uplinks/" + name: col for name, col in index["uplinks"].items()}
+        for eui, gw in index["gateways"].items():
+            arrays.update({eui + "/" + name: col for name, col in gw.items()})
+        _save(entry, arrays)
+        return index
+
+    index = {"uplinks": {}, "gateways": {}}
+    for key, col in arrays.items():
+        group, name = key.split("/")
+        if group == "uplinks":
+            index["uplinks"][name] = col
+        else:
+            index["gateways"].setdefault(group, {})[name] = col
+    return index
+
+def readColumnsFile(path, gw_eui="58A0CBFFFE802A21"):
+    # helper.readColumns() of a measurement file, cached
+    return helper.selectGateway(readGatewaysFile(path), gw_eui)
+
+def messagesEntry(path, nominal, tolerance, phaseDelta, bits, watermarkShift=13, gw_eui="58A0CBFFFE802A21", gw_ts_name="gwTs", spreading=False, spreadingSeed=int("BEEF", 16), ecc=False):
+    # Cache entry of the decoded messages, also usable as key for results
+    # derived from them
+    params = [nominal, tolerance, phaseDelta, bits, watermarkShift, gw_eui, gw_ts_name, spreading, spreadingSeed, ecc]
+    return _entryPath(path, "messages", params)
+
+def readMessagesFile(path, nominal, tolerance, phaseDelta, bits, printMatches, watermarkShift=13, gw_eui="58A0CBFFFE802A21", gw_ts_name="gwTs", spreading=False, spreadingSeed=int("BEEF", 16), ecc=False):
+    # helper.readMessagesBatch() of a measurement file, cached
+    entry = messagesEntry(path, nominal, tolerance, phaseDelta, bits, watermarkShift, gw_eui, gw_ts_name, spreading, spreadingSeed, ecc)
+    arrays = _load(entry)
+
+    if arrays == None:
+        cols = readColumnsFile(path, gw_eui)
+        res = helper.decodeColumns(cols, nominal, tolerance, phaseDelta, bits, watermarkShift, gw_ts_name, spreading, spreadingSeed, ecc)
+        msgs = helper.buildMessageTable(cols, res, gw_ts_name, spreading)
+
+        arrays = dict(msgs.columns)
+        arrays["_counters"] = np.array([res["numMsgsLost"], res["numSymbolsPossible"], res["numSymbolErrors"], res["ecc"]["dualBit"], res["ecc"]["singleBit"], res["ecc"]["noErr"]], np.int64)
+        _save(entry, arrays)
+
+    counters = arrays.pop("_counters").tolist()
+    msgs = helper.MessageTable(len(arrays["loraMsgId"]), arrays)
+    helper.printMessages(msgs, printMatches, gw_ts_name)
+
+    return {"msgs": msgs, "numMsgsLost": counters[0], "numSymbolsPossible": counters[1], "numSymbolErrors": counters[2], "ecc": {"dualBit": counters[3], "singleBit": counters[4], "noErr": counters[5]}}
+
+def readDerivedFile(path, kind, params, compute):
+    # Result derived from a measurement file (e.g. a histogram of the decoded
+    # messages), cached. params must hold everything the result depends on,
+    # compute() returns it as dict of arrays
+    entry = _entryPath(path, kind, params)
+    arrays = _load(entry)
+
+    if arrays == None:
+        arrays = compute()
+        _save(entry, arrays)
+
+    return arrays
+
+if __name__ == "__main__":
+    if (len(sys.argv) < 2):
+        print("Too less arguments!")
+        print("Use: python3 {0} measurement_file [measurement_file ...]".format(sys.argv[0]))
+        print("Drops all cached entries of the given measurement files")
+        exit(1)
+
+    for f in sys.argv[1:]:
+        invalidate(f)
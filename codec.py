@@ -0,0 +1,40 @@
+import numpy as np
+
+# Sensor payload formats
+# The sensors send one 32 bit value (payload.raw), what it holds depends on
+# the firmware. Every format lists its fields as
+#   [name, shift, bits, divisor, offset]
+# and a field is ((raw >> shift) & (2**bits - 1)) / divisor + offset.
+# decode() extracts all fields of a format for a whole payload column at
+# once. The format of a measurement is set with "codec" in experiments.py.
+
+CODECS = {
+    # Timestamp of the mcu [ms]
+    "counter": [
+        ["ms", 0, 32, 1, 0],
+    ],
+    # Random values of the lfsr
+    "random": [
+        ["value", 0, 32, 1, 0],
+    ],
+    # Supply voltage [mV] and temperature [1/64 K] of the field sensors
+    "temp_vdd": [
+        ["vdd_V", 16, 16, 1000, 0],
+        ["temp_C", 0, 16, 2**6, -273.15],
+    ],
+}
+
+def decode(name, raw):
+    # Returns {field: array}, unscaled fields stay int64
+    # Missing payloads (-1) are -1 or NaN, like in helper.MessageTable
+    raw = np.asarray(raw, np.int64)
+    missing = raw < 0
+
+    fields = {}
+    for field, shift, bits, divisor, offset in CODECS[name]:
+        value = (raw >> shift) & (2**bits - 1)
+        if divisor != 1 or offset != 0:
+            fields[field] = np.where(missing, np.nan, value / divisor + offset)
+        else:
+            fields[field] = np.where(missing, -1, value)
+    return fields
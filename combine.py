@@ -1,64 +1,45 @@
-import json
+import os
 import sys
 
+import ingest
+
 if (len(sys.argv) < 3):
     print("Too less arguments!")
     print("Use: python3 {0} in_file out_file".format(sys.argv[0]))
     exit(1)
 
-in_file = open(sys.argv[1], "r")
-
-try:
-    out_file = open(sys.argv[2], "r")
-    o_json = json.loads(out_file.read())
-    out_file.close()
-except OSError as e:
-    o_json = []
-
-# Read all json nodes in out_file
-
-def readjson(f):
-    j = []
-    try:
-        s = f.readlines()
-    except:
-        return []
-
-    for line in s:
-        if line == '\n':
-            continue
+# Duplicates are found by ingest.uplinkKey(), with a set the merge is linear
+key = ingest.uplinkKey
+
+seen = set()
+numKept = 0
+numAdded = 0
+numIgnored = 0
+
+def merge():
+    global numKept, numAdded, numIgnored
+
+    # A missing out_file is created, any other error while reading it must
+    # not replace it with what was read so far
+    if os.path.exists(sys.argv[2]):
+        for element in ingest.iterUplinks(sys.argv[2]):
+            k = key(element)
+            if not k in seen:
+                seen.add(k)
+                numKept += 1
+                yield element
+
+    for element in ingest.iterUplinks(sys.argv[1]):
+        k = key(element)
+        if not k in seen:
+            seen.add(k)
+            numAdded += 1
+            yield element
         else:
-            j.append(json.loads(line))
-
-    return j
-
-i_json = readjson(in_file)
-
-in_file.close()
-
-# Extract only "received_at" timestamps of both
-ij_timestamps = []
-for ij in i_json:
-    ij_timestamps.append(ij["result"]["received_at"])
-
-oj_timestamps = []
-for oj in o_json:
-    oj_timestamps.append(oj["result"]["received_at"])
+            numIgnored += 1
 
-for ij_ts in ij_timestamps:
-    if not ij_ts in oj_timestamps:
-        # Find ij entry
-        ij_found = None
-        for ij in i_json:
-            if ij["result"]["received_at"] == ij_ts:
-                ij_found = ij
-                break
-        # Add to list
-        print("Adding: {0}".format(ij_found))
-        o_json.append(ij_found)
-    else:
-        print("Ignoring: {0}".format(ij_ts))
+# Both files are streamed one uplink at a time, out_file is replaced
+# atomically at the end
+ingest.writeUplinks(sys.argv[2], merge())
 
-out_file = open(sys.argv[2], "w")
-out_file.write(json.dumps(o_json))
-out_file.close()
+print("Kept: {0}, Added: {1}, Ignored: {2}".format(numKept, numAdded, numIgnored))
@@ -0,0 +1,58 @@
+import numpy as np
+
+# Downsampling of line plots
+# Long captures have far more messages than a plot has pixels. The x range
+# is split into equally wide buckets (about one per pixel column) and only the
+# first, last, smallest and largest point of every bucket are kept (M4), so
+# the drawn line looks the same: outliers stay, lost messages (jumps in x)
+# stay, and a NaN (no timestamp) is kept to break the line where it did.
+# Plots with less than the target number of points are not changed.
+
+# Number of points drawn per line by default
+TARGET_POINTS = 4000
+
+def _firstPerBucket(bucket, mask):
+    # Index of the first True of mask in every bucket, -1 if there is none
+    idx = np.flatnonzero(mask)
+    first = np.full(bucket[-1] + 1, -1)
+    b, pos = np.unique(bucket[idx], return_index=True)
+    first[b] = idx[pos]
+    return first
+
+def m4(x, y, target=TARGET_POINTS):
+    # Returns the points of x, y (x ascending) to draw, at most about target
+    x = np.asarray(x, float)
+    y = np.asarray(y, float)
+
+    if target == None or len(x) <= target or np.any(np.diff(x) < 0):
+        return [x, y]
+
+    buckets = max(target // 4, 1)
+    span = x[-1] - x[0]
+    if span > 0:
+        bucket = np.minimum(((x - x[0]) / span * buckets).astype(int), buckets - 1)
+    else:
+        bucket = np.zeros(len(x), int)
+    # Buckets without points are not used
+    bucket = np.unique(bucket, return_inverse=True)[1]
+
+    nan = np.isnan(y)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(x)] - 1
+
+    yMin = np.minimum.reduceat(np.where(nan, np.inf, y), starts)
+    yMax = np.maximum.reduceat(np.where(nan, -np.inf, y), starts)
+
+    keep = [starts, ends]
+    keep.append(_firstPerBucket(bucket, y == yMin[bucket]))
+    keep.append(_firstPerBucket(bucket, y == yMax[bucket]))
+    keep.append(_firstPerBucket(bucket, nan))
+
+    keep = np.unique(np.concatenate(keep))
+    keep = keep[keep >= 0]
+    return [x[keep], y[keep]]
+
+def plot(ax, x, y, *args, target=TARGET_POINTS, **kwargs):
+    # ax.plot() of the downsampled points
+    x, y = m4(x, y, target)
+    return ax.plot(x, y, *args, **kwargs)
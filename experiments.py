@@ -0,0 +1,358 @@
+import os
+import sys
+import importlib
+
+import helper
+import ingest
+import histogram
+import downsample
+import codec
+
+# Registry of all measurements
+# Every measurement only differs in its file and decoder settings, which are
+# kept here instead of in each mea_*/analyze.py. Measurements are looked up
+# by name (= directory), nothing is read or imported before it is needed.
+# matplotlib is only imported for plotting.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Settings used if a measurement does not set them
+DEFAULTS = {
+    "file": "out.json",
+    "printMatches": False,
+    "nominal": 300,             # [s]
+    "tolerance": 0.025,         # [s]
+    "phaseDelta": 0.050,        # [s]
+    "bits": 1,
+    "watermarkShift": 13,
+    "spreading": False,
+    "spreadingSeed": int("BEEF", 16),
+    "ecc": False,
+    "codec": "counter",         # Payload format, see codec.py
+    "gw_eui": "58A0CBFFFE802A21",
+    "gw_ts_name": "gwTs",
+    "gw_euis": None,            # Gateways to compare, see analyzeGateways()
+    "histBins": 200,
+    "plotPoints": downsample.TARGET_POINTS, # Points per line, see downsample.py
+    "subplotSize": [4,3],
+    "suptitle": "",
+    "printMissing": True,       # Print missing packets when plotting
+    "printAfterShow": False,    # Print the summary after the plots are closed
+    "plot": None,               # Module with its own plot(), None for plot()
+}
+
+EXPERIMENTS = {
+    "mea_11_jitter": {
+        "tolerance": 1,
+        "phaseDelta": 1,
+        "suptitle": "Jitter",
+        "printMissing": False,
+        "plot": "mea_11_jitter.analyze",
+    },
+    "mea_12_xor_dpsk_10s": {
+        "tolerance": 5,
+        "phaseDelta": 10,
+        "subplotSize": [4,4],
+        "suptitle": "DPSK 10 s",
+        "printMissing": False,
+        "printAfterShow": True,
+    },
+    "mea_13_xor_dpsk_20ms": {
+        "tolerance": 0.010,
+        "phaseDelta": 0.020,
+        "suptitle": "DPSK 20 ms",
+    },
+    "mea_14_xor_dpsk_30ms": {
+        "tolerance": 0.015,
+        "phaseDelta": 0.030,
+        "suptitle": "DPSK 30 ms",
+    },
+    "mea_15_xor_dpsk_40ms": {
+        "tolerance": 0.020,
+        "phaseDelta": 0.040,
+        "suptitle": "DPSK 40 ms",
+    },
+    "mea_16_xor_dpsk_50ms": {
+        "suptitle": "DPSK 50 ms",
+    },
+    "mea_17_xor_dpsk_60ms": {
+        "tolerance": 0.030,
+        "phaseDelta": 0.060,
+        "suptitle": "DPSK 60 ms",
+    },
+    "mea_18_xor_dpsk_70ms": {
+        "tolerance": 0.035,
+        "phaseDelta": 0.070,
+        "suptitle": "DPSK 70 ms",
+    },
+    "mea_19_xor_dpsk_100ms": {
+        "tolerance": 0.05,
+        "phaseDelta": 0.1,
+        "suptitle": "DPSK 100 ms",
+    },
+    "mea_20_xor_dpsk_nojumpback_100ms": {
+        "file": "nojump_100ms.json",
+        "tolerance": 0.05,
+        "phaseDelta": 0.1,
+        "suptitle": "DPSK 100 ms no jumpback",
+    },
+    "mea_21_xor_dpsk_nojumpback_50ms": {
+        "file": "nojump_50ms.json",
+        "suptitle": "DPSK 50 ms no jumpback",
+    },
+    "mea_22_xor_8bit": {
+        "file": "8bit.json",
+        "bits": 8,
+        "suptitle": "8 bit encoding",
+    },
+    "mea_24_xor_2bit": {
+        "file": "2bit.json",
+        "bits": 2,
+        "suptitle": "2 bit encoding",
+    },
+    "mea_25_xor_4bit": {
+        "file": "4bit.json",
+        "bits": 4,
+        "suptitle": "4 bit encoding",
+    },
+    "mea_27_xor_4bit_lfsr_fix": {
+        "file": "4bit_lfsr.json",
+        "bits": 4,
+        "watermarkShift": 0,
+        "codec": "random",
+        "suptitle": "4 bit encoding with random values",
+    },
+    "mea_28_xor_4bit_lfsr_ss": {
+        "file": "4bit_ss.json",
+        "bits": 4,
+        "watermarkShift": 0,
+        "spreading": True,
+        "codec": "random",
+        "suptitle": "4 bit encoding with random values and spread spectrum",
+    },
+    "mea_29_xor_4bit_hamming_50ms": {
+        "file": "ecc_50ms.json",
+        "bits": 4,
+        "watermarkShift": 0,
+        "ecc": True,
+        "codec": "random",
+        "suptitle": "Hamming(8,4) with 50ms step size",
+    },
+    "mea_30_xor_4bit_feld": {
+        "file": "feld.json",
+        "bits": 4,
+        "watermarkShift": 0,
+        "codec": "temp_vdd",
+        "suptitle": "open field SF7",
+    },
+    "mea_31_xor_4bit_hochstand": {
+        "file": "hochstand.json",
+        "nominal": 70*60 - 0.04,
+        "bits": 4,
+        "watermarkShift": 0,
+        "gw_euis": ["58A0CBFFFE802A21", "AC1F09FFFE004F1F"], # ttig, kaiserkogel
+        "codec": "temp_vdd",
+        "suptitle": "open field SF12",
+    },
+}
+
+NAMES = list(EXPERIMENTS)
+
+def get(name):
+    # Settings of a measurement, "path" is the absolute path of its file
+    e = dict(DEFAULTS)
+    e.update(EXPERIMENTS[name])
+    e["name"] = name
+    e["path"] = os.path.join(ROOT, name, e["file"])
+    return e
+
+def readMeasurements(name):
+    # Uplinks are read one by one while decoding
+    return ingest.iterUplinks(get(name)["path"])
+
+def analyze(name, measurements=None, **settings):
+    # Decode a measurement, settings overwrite the registry (e.g. gw_eui)
+    # Without measurements the file is decoded through the on-disk cache
+    e = get(name)
+    e.update(settings)
+    if measurements is None:
+        measurements = e["path"]
+
+    return helper.readMessagesBatch(measurements, e["nominal"], e["tolerance"], e["phaseDelta"], e["bits"], e["printMatches"], watermarkShift=e["watermarkShift"], gw_eui=e["gw_eui"], gw_ts_name=e["gw_ts_name"], spreading=e["spreading"], spreadingSeed=e["spreadingSeed"], ecc=e["ecc"])
+
+def cacheKey(name, **settings):
+    # Key of the decoded messages in the cache, see cache.messagesEntry()
+    import cache
+
+    e = get(name)
+    e.update(settings)
+    return cache.messagesEntry(e["path"], e["nominal"], e["tolerance"], e["phaseDelta"], e["bits"], watermarkShift=e["watermarkShift"], gw_eui=e["gw_eui"], gw_ts_name=e["gw_ts_name"], spreading=e["spreading"], spreadingSeed=e["spreadingSeed"], ecc=e["ecc"])
+
+def analyzeGateways(name, measurements=None, **settings):
+    # Decode against all gateways in "gw_euis" from one pass over the uplinks
+    e = get(name)
+    e.update(settings)
+    if measurements is None:
+        measurements = e["path"]
+
+    return helper.readMessagesGateways(measurements, e["nominal"], e["tolerance"], e["phaseDelta"], e["bits"], e["printMatches"], watermarkShift=e["watermarkShift"], gw_euis=e["gw_euis"], gw_ts_name=e["gw_ts_name"], spreading=e["spreading"], spreadingSeed=e["spreadingSeed"], ecc=e["ecc"])
+
+def deltaMs(e, msgs, column):
+    # Deviation of a delta column from the nominal interval [ms]
+    # All delta columns are in seconds, payload.delta as well
+    return (msgs.column(column) - e["nominal"]) * 1000
+
+def deltaHistogram(name, column="gwTs.delta", start=0, low=None, density=False, **settings):
+    # histogram.compute() of deltaMs() with "histBins" bins, without the
+    # first start messages and values <= low
+    # Cached next to the decoded messages, which are only read on a miss
+    import cache
+
+    e = get(name)
+    e.update(settings)
+    params = [histogram.VERSION, os.path.basename(cacheKey(name, **settings)), column, start, low, e["histBins"], density]
+
+    def compute():
+        y = deltaMs(e, analyze(name, **settings)["msgs"], column)[start:]
+        if low != None:
+            y = y[y > low]
+        return histogram.compute(y, e["histBins"], density)
+
+    return cache.readDerivedFile(e["path"], "histogram", params, compute)
+
+def payloadFields(e, msgs):
+    # Fields of the payload format of a measurement, see codec.py
+    return codec.decode(e["codec"], msgs.column("payload.raw"))
+
+def checkOrder(e, msgs):
+    # Check if messages are ordered correctly
+    msg_id_head = 0
+    for msg_id in msgs.column("loraMsgId").tolist():
+        if (msg_id_head+1 < msg_id):
+            if e["printMissing"]:
+                print("{0} Packet(s) missing at {1}".format(msg_id - (msg_id_head+1), msg_id))
+        elif (msg_id_head+1 > msg_id):
+            print("Something is very wrong here! head: {0} id: {1}".format(msg_id_head, msg_id))
+        msg_id_head = msg_id
+
+def plotTimestamps(e, msgs):
+    # Arranges the plots and draws absolute and delta timestamps
+    import matplotlib.pyplot as plt
+
+    fig, axs = plt.subplots(e["subplotSize"][0],e["subplotSize"][1])
+    fig.suptitle(e["suptitle"])
+
+    # Print x-y diagram of absolute timestamps
+    downsample.plot(axs[0][0], msgs.column("loraMsgId"), msgs.column("gwTs.seconds"), "r.-", target=e["plotPoints"])
+    axs[0][0].set_title("Absolute timestamps")
+    axs[0][0].set_xlabel('msg')
+    axs[0][0].set_ylabel('gateway timestamp [s]', color='r')
+    axs[0][0].tick_params('y', colors='r')
+    axs[0][0].grid(True)
+
+    ax002 = axs[0][0].twinx()
+
+    downsample.plot(ax002, msgs.column("loraMsgId"), msgs.column("payload.seconds"), "b.-", target=e["plotPoints"])
+    ax002.set_ylabel('mcu timestamp [s]', color='b')
+    ax002.tick_params('y', colors='b')
+
+    # Print x-y diagram of delta timestamps
+
+    downsample.plot(axs[0][1], msgs.column("loraMsgId"), msgs.column("gwTs.delta"), "r.-", target=e["plotPoints"])
+    axs[0][1].set_title("Delta timestamps")
+    axs[0][1].set_xlabel('msg')
+    axs[0][1].set_ylabel('gateway delta timestamp [s]', color='r')
+    axs[0][1].tick_params('y', colors='r')
+    axs[0][1].grid(True)
+
+    downsample.plot(axs[0][2], msgs.column("loraMsgId"), msgs.column("payload.delta"), "b.-", target=e["plotPoints"])
+    axs[0][2].set_title("Delta timestamps")
+    axs[0][2].set_xlabel('msg')
+    axs[0][2].set_ylabel('mcu delta timestamp [s]', color='b')
+    axs[0][2].tick_params('y', colors='b')
+    axs[0][2].grid(True)
+
+    downsample.plot(axs[1][1], msgs.column("loraMsgId"), msgs.column("modemTs.delta"), "r.-", target=e["plotPoints"])
+    axs[1][1].set_title("Delta timestamps")
+    axs[1][1].set_xlabel('msg')
+    axs[1][1].set_ylabel('gateway delta timestamp [s]', color='r')
+    axs[1][1].tick_params('y', colors='r')
+    axs[1][1].grid(True)
+
+    downsample.plot(axs[1][2], msgs.column("loraMsgId"), msgs.column("modemTs.seconds"), "r.-", target=e["plotPoints"])
+    axs[1][2].set_title("Delta timestamps")
+    axs[1][2].set_xlabel('msg')
+    axs[1][2].set_ylabel('gateway delta timestamp [s]', color='r')
+    axs[1][2].tick_params('y', colors='r')
+    axs[1][2].grid(True)
+
+    return [fig, axs]
+
+def plotHistograms(e, axs, h1, h2, h3, h4):
+    # h1: mcu, h2: gateway, h3: network, h4: modem deltas [ms], see histogram.py
+    histogram.draw(axs[1][0], h1, color='b')
+    axs[1][0].set_title("Histogram mcu timestamps")
+    axs[1][0].set_xlabel("ms")
+
+    histogram.draw(axs[2][0], h2, color='r')
+    axs[2][0].set_title("Histogram gateway timestamps")
+    axs[2][0].set_xlabel("ms")
+
+    histogram.draw(axs[2][1], h4, color='r')
+    axs[2][1].set_title("Histogram gateway timestamps")
+    axs[2][1].set_xlabel("ms")
+
+    histogram.draw(axs[3][0], h3, color='g')
+    axs[3][0].set_title("Histogram network timestamps")
+    axs[3][0].set_xlabel("ms")
+
+def plot(name):
+    e = get(name)
+    if e["plot"] != None:
+        return importlib.import_module(e["plot"]).plot()
+
+    import matplotlib.pyplot as plt
+
+    # Ignore NONE in list
+    import warnings
+    warnings.filterwarnings("ignore", category=RuntimeWarning)
+
+    res = analyze(name)
+    msgs = res["msgs"]
+
+    checkOrder(e, msgs)
+    fig, axs = plotTimestamps(e, msgs)
+
+    # Print histogram
+    # Get rid of packet loss and
+    # normalize to first value received and pad to ms
+    h1 = deltaHistogram(name, "payload.delta")
+    h2 = deltaHistogram(name, "gwTs.delta")
+    h3 = deltaHistogram(name, "nwTs.delta")
+    h4 = deltaHistogram(name, "modemTs.delta")
+
+    plotHistograms(e, axs, h1, h2, h3, h4)
+
+    if e["printAfterShow"]:
+        plt.show()
+
+    helper.printCalculations(res)
+
+    if e["ecc"]:
+        print("ECC:")
+        print("\tnoErr: {0}".format(res["ecc"]["noErr"]))
+        print("\tsingleBit: {0}".format(res["ecc"]["singleBit"]))
+        print("\tdualBit: {0}".format(res["ecc"]["dualBit"]))
+
+    if not e["printAfterShow"]:
+        plt.show()
+
+if __name__ == "__main__":
+    if (len(sys.argv) < 2):
+        print("Too less arguments!")
+        print("Use: python3 {0} measurement [measurement ...]".format(sys.argv[0]))
+        print("Measurements: {0}".format(", ".join(NAMES)))
+        exit(1)
+
+    for name in sys.argv[1:]:
+        plot(name.strip("/"))
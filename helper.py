@@ -1,6 +1,7 @@
+import array
 import base64
 import struct
-import datetime
+import math
 import numpy as np
 import copy
 
@@ -44,20 +45,24 @@ def _extractSymbol_onebit(deltaTimestamp, nominal, phaseDelta, tolerance):
     else:
         return 1
 
+def _sliceSymbol(delta, tol, bits):
+    # delta is normalized to phaseDelta, symbol i is found if delta is in
+    # [i-tol, i+tol]. If the windows overlap (tol >= 0.5) the smallest
+    # symbol wins.
+    i = max(0, math.ceil(delta - tol))
+
+    if i < 2**bits and delta - i >= -tol:
+        return i
+    return None
+
 def extractSymbol(deltaTimestamp, nominal, phaseDelta, tolerance, bits):
     if bits == 1:
         return _extractSymbol_onebit(deltaTimestamp, nominal, phaseDelta, tolerance)
 
     delta = abs(deltaTimestamp-nominal)/phaseDelta
     tol = tolerance/phaseDelta
-    for i in range(2**bits):
-        if delta >= -tol and delta <= tol:
-            return i
-        elif delta < -tol:
-            return None
-        else:
-            delta -= 1
-    return None
+
+    return _sliceSymbol(delta, tol, bits)
 
 def extractSymbol_ss(deltaTimestamp, nominal, phaseDelta, tolerance, bits, spreadingDelay, prevSpreadingDelay):
     deltaDespread = deltaTimestamp - spreadingDelay + prevSpreadingDelay
@@ -65,23 +70,12 @@ def extractSymbol_ss(deltaTimestamp, nominal, phaseDelta, tolerance, bits, sprea
     delta = abs(deltaDespread-nominal)/phaseDelta
     tol = tolerance/phaseDelta
 
-    for i in range(2**bits):
-        if delta >= -tol and delta <= tol:
-            return [i, deltaDespread]
-        elif delta < -tol:
-            return [None, deltaDespread]
-        else:
-            delta -= 1
+    return [_sliceSymbol(delta, tol, bits), deltaDespread]
 
-def extractSymbol_ecc(deltaTimestamp, nominal, phaseDelta, tolerance, bits):
-
-    symbol = extractSymbol(deltaTimestamp, nominal, phaseDelta, tolerance, bits*2)
+def _decodeHamming84(symbol):
     ecc_errors = 0
 
-    if symbol == None:
-        return [None, None]
-
-    # Now perform error correction according to ham(8,4)
+    # Perform error correction according to ham(8,4)
     # format = 0b (d3) (d2) (d1) (c2) (d0) (c1) (c0) (p)
 
     p = symbol & 0x1
@@ -142,23 +136,83 @@ def extractSymbol_ecc(deltaTimestamp, nominal, phaseDelta, tolerance, bits):
     else:
         return [ecc_errors, data]
 
-def _conv_timestamp(s):
-    # Convert timestamps from the format given by TTN to internal one
-    # Example:
-    # "2022-06-23T20:54:01.621829032Z" -> len() = 30
-    # "2022-06-23T20:49:01.625Z"
+# Decode table for every possible received byte
+_HAMMING84 = [_decodeHamming84(symbol) for symbol in range(256)]
+
+# Same table as arrays for decodeHamming84Array(), -1 marks None
+HAMMING84_ECC_ERRORS = np.array([eccErrors for eccErrors, data in _HAMMING84], np.int64)
+HAMMING84_DATA = np.array([-1 if data == None else data for eccErrors, data in _HAMMING84], np.int64)
+
+def decodeHamming84(symbol):
+    # Returns [eccErrors, data] of a received byte
+    if symbol < 0 or symbol > 0xff:
+        raise ValueError("Hamming(8,4) symbol must be one byte, not {0}".format(symbol))
+    return list(_HAMMING84[symbol])
+
+def _checkEccBits(bits):
+    # Hamming(8,4) carries 4 data bits in a symbol of 8 bits
+    if bits != 4:
+        raise ValueError("ecc needs bits=4, not {0}".format(bits))
 
-    # datetime.strptime() can only work with fractionals
-    # at a maximum of 6
+def decodeHamming84Array(symbol):
+    # Vectorized decodeHamming84(), -1 marks None
+    valid = symbol >= 0
+    symbol = np.where(valid, symbol, 0)
 
-    # Delete Z at end
-    s = s[:-1]
+    return [np.where(valid, HAMMING84_ECC_ERRORS[symbol], -1), np.where(valid, HAMMING84_DATA[symbol], -1)]
 
-    # Delete fractual seconds that are too long
-    if (len(s) > 26):
-        s = s[:26]
+def extractSymbol_ecc(deltaTimestamp, nominal, phaseDelta, tolerance, bits):
+    _checkEccBits(bits)
+    symbol = extractSymbol(deltaTimestamp, nominal, phaseDelta, tolerance, bits*2)
+
+    if symbol == None:
+        return [None, None]
 
-    return datetime.datetime.strptime(s, "%Y-%m-%dT%H:%M:%S.%f")
+    return decodeHamming84(symbol)
+
+def _daysFromCivil(year, month, day):
+    # Days since 1970-01-01 of a date in the proleptic gregorian calendar,
+    # works for ints and integer arrays
+    year = year - (month <= 2)
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+def conv_timestamp_ns(s):
+    # Convert timestamps given by TTN to integer nanoseconds since epoch (UTC)
+    # All fractional digits are kept, the "Z" (UTC) is honoured on any host
+    # "2022-06-23T20:54:01.621829032Z" -> 1656017641621829032
+    days = _daysFromCivil(int(s[0:4]), int(s[5:7]), int(s[8:10]))
+    seconds = days * 86400 + int(s[11:13]) * 3600 + int(s[14:16]) * 60 + int(s[17:19])
+
+    frac = s[20:-1] if s[19] == "." else ""
+    return seconds * 10**9 + int((frac + "000000000")[:9])
+
+def conv_timestamp_ns_array(strings):
+    # Vectorized conv_timestamp_ns() for a list or array of timestamps
+    a = np.array(strings, dtype="S32")
+    b = a.view(np.uint8).reshape(len(a), 32).astype(np.int64) - ord("0")
+
+    year = b[:, 0] * 1000 + b[:, 1] * 100 + b[:, 2] * 10 + b[:, 3]
+    month = b[:, 5] * 10 + b[:, 6]
+    day = b[:, 8] * 10 + b[:, 9]
+    seconds = _daysFromCivil(year, month, day) * 86400
+    seconds += (b[:, 11] * 10 + b[:, 12]) * 3600 + (b[:, 14] * 10 + b[:, 15]) * 60 + b[:, 17] * 10 + b[:, 18]
+
+    # Fractional digits end at "Z", missing digits count as 0
+    frac = b[:, 20:29]
+    isDigit = np.cumprod((frac >= 0) & (frac <= 9), axis=1)
+    isDigit[b[:, 19] != ord(".") - ord("0")] = 0
+    ns = (frac * isDigit) @ (10 ** np.arange(8, -1, -1, dtype=np.int64))
+
+    return seconds * 10**9 + ns
+
+def conv_duration_ns(s):
+    # "1.318912s" -> 1318912000
+    whole, _, frac = s[:-1].partition(".")
+    return int(whole) * 10**9 + int((frac + "000000000")[:9])
 
 def calcUsDelta(ts, substractor):
     # Need to compensate for:
@@ -180,7 +234,7 @@ def readGw(element, gw_eui, onAirTime_s, msg):
             msg["modemTs"]["raw"] = int(gw["timestamp"])
             msg["modemTs"]["seconds"] = calcUsDelta(msg["modemTs"]["raw"] / (1000 * 1000), onAirTime_s)
 
-            msg["gwTs"]["raw"] = _conv_timestamp(gw["time"]).timestamp()
+            msg["gwTs"]["raw"] = conv_timestamp_ns(gw["time"]) / 10**9
             msg["gwTs"]["seconds"] = msg["gwTs"]["raw"] - onAirTime_s
 
             try:
@@ -207,10 +261,51 @@ def calcIpd(element, msg, preMsg, tsName):
         msg["nwTs"]["delta"] = msg["nwTs"]["seconds"] - preMsg["nwTs"]["seconds"]
         msg["payload"]["delta"] = msg["payload"]["seconds"] - preMsg["payload"]["seconds"]
 
+# xorshift16 has a full period of 2**16-1, every non zero state lies on the
+# same orbit. With the orbit and the position of each state on it, the state
+# after n steps is a table lookup instead of replaying n steps from the seed.
+XORSHIFT_PERIOD = 2**16 - 1
+_xorshiftOrbit = None
+_xorshiftIndex = None
+
+def _xorshiftTables():
+    global _xorshiftOrbit, _xorshiftIndex
+
+    if _xorshiftOrbit is None:
+        orbit = np.zeros(XORSHIFT_PERIOD, np.int64)
+        index = np.zeros(2**16, np.int64)
+        lfsr = 1
+        for i in range(XORSHIFT_PERIOD):
+            orbit[i] = lfsr
+            index[lfsr] = i
+            lfsr = xorshift(lfsr)
+        _xorshiftOrbit = orbit
+        _xorshiftIndex = index
+
+    return [_xorshiftOrbit, _xorshiftIndex]
+
+def xorshiftJump(lfsr, steps):
+    # Same as calling xorshift() steps times, works on arrays of steps
+    orbit, index = _xorshiftTables()
+    steps = np.maximum(steps, 0)
+
+    if lfsr == 0:
+        # 0 is a fixpoint and not part of the orbit
+        return np.zeros_like(steps)
+
+    return orbit[(index[lfsr] + steps) % XORSHIFT_PERIOD]
+
 def getSpreadingParam(msgId, spreadingSeed, delayWindow_ms):
-    spreadingSeq = spreadingSeed
-    for i in range(msgId):
-        spreadingSeq = xorshift(spreadingSeq)
+    spreadingSeq = int(xorshiftJump(spreadingSeed, msgId))
+
+    spreadingDelay_ms = delayWindow_ms + ((spreadingSeq * 2*delayWindow_ms) / 2**16)
+    spreadingDelay_s = spreadingDelay_ms / 1000
+
+    return [spreadingSeq, spreadingDelay_s]
+
+def getSpreadingParamArray(msgIds, spreadingSeed, delayWindow_ms):
+    # Vectorized getSpreadingParam() for an array of message IDs
+    spreadingSeq = xorshiftJump(spreadingSeed, np.asarray(msgIds, np.int64))
 
     spreadingDelay_ms = delayWindow_ms + ((spreadingSeq * 2*delayWindow_ms) / 2**16)
     spreadingDelay_s = spreadingDelay_ms / 1000
@@ -242,7 +337,7 @@ def readMessages(data, nominal, tolerance, phaseDelta, bits, printMatches, water
             # Not found, treat like a lost message and do not store in msgs
             continue
 
-        msg["nwTs"]["raw"] = _conv_timestamp(element["result"]["received_at"]).timestamp()
+        msg["nwTs"]["raw"] = conv_timestamp_ns(element["result"]["received_at"]) / 10**9
         msg["nwTs"]["seconds"] = msg["nwTs"]["raw"] - onAirTime_s
 
         a = element["result"]["uplink_message"]["frm_payload"]
@@ -326,6 +421,763 @@ def readMessages(data, nominal, tolerance, phaseDelta, bits, printMatches, water
 
     return {"msgs": msgs, "numMsgsLost": numMsgsLost, "numSymbolsPossible": symbols["possible"], "numSymbolErrors": symbols["errors"], "ecc": error_correction}
 
+# Batch engine
+# Same decisions as readMessages(), but the uplinks are first parsed into
+# columns (one numpy array per field) and all calculations are done on
+# whole arrays instead of message by message.
+
+# Concentrator counter (rx_metadata.timestamp)
+# A 32 bit microsecond counter, it wraps every 2**32 us (~71.6 min) and the
+# packet forwarder resets it (about every 24 h). The number of wraps between
+# two messages is taken from the gateway time, so intervals longer than a
+# wrap work as well. A step which still differs from the gateway time by more
+# than US_RESET_TOLERANCE is a reset, the counter does not tell how much time
+# passed, so the modemTs delta is unknown (NaN) there. The same is done for
+# steps from or to a message without counter (-1).
+# readMessages() keeps the old per-message calcUsDelta().
+US_WRAP = 2**32
+US_RESET_TOLERANCE = 1000 * 1000 # [us]
+
+def usSteps(prevRaw, raw, refStepUs):
+    # Counter steps [us] from prevRaw to raw with the wraps of the reference
+    # steps [us] added
+    # Returns [steps, reset], at a reset the reference step is used
+    rawStep = raw - prevRaw
+    wraps = np.round((refStepUs - rawStep) / US_WRAP).astype(np.int64)
+    steps = rawStep + wraps * US_WRAP
+    reset = (np.abs(steps - refStepUs) > US_RESET_TOLERANCE) | (prevRaw < 0) | (raw < 0)
+    return [np.where(reset, refStepUs, steps), reset]
+
+def unwrapUs(raw, refNs):
+    # Monotonically increasing int64 us series of the raw counter, refNs is
+    # the gateway time [ns] of the same messages
+    # Returns [us, reset], reset marks messages after a counter reset
+    raw = np.asarray(raw, np.int64)
+    us = raw.copy()
+    reset = np.zeros(len(raw), bool)
+
+    if len(raw) > 1:
+        steps, reset[1:] = usSteps(raw[:-1], raw[1:], np.diff(refNs) // 1000)
+        us[1:] = raw[0] + np.cumsum(steps)
+
+    return [us, reset]
+
+PARSE_BLOCK = 4096
+
+def decodePayload(frm_payload):
+    # Same conversion as readMessages(), without the hex strings: the payload
+    # is padded in front to 8 bytes and read as little endian
+    a = struct.unpack("<Q", base64.b64decode(frm_payload).rjust(8, b"\0"))[0]
+    return int(a / 2**32)  # Pad to 32 bit and use [ms]
+
+# Value of every base64 character, "=" and padding count as 0
+_BASE64 = np.zeros(256, np.int64)
+_BASE64[np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/", np.uint8)] = np.arange(64)
+
+def decodePayloadArray(payloads):
+    # Vectorized decodePayload() for a list or array of frm_payloads
+    # All payloads are base64 decoded at once into one buffer of 8 bytes per
+    # payload (padded in front) which is viewed as little endian uint64
+    a = np.array(payloads, dtype="S")
+    if a.dtype.itemsize > 12:
+        raise ValueError("frm_payload longer than 8 bytes")
+    n = len(a)
+    c = a.astype("S12").view(np.uint8).reshape(n, 12)
+
+    # 4 characters -> 3 bytes
+    v = _BASE64[c].reshape(n, 3, 4)
+    b = np.stack((v[:, :, 0] << 2 | v[:, :, 1] >> 4, (v[:, :, 1] & 0xf) << 4 | v[:, :, 2] >> 2, (v[:, :, 2] & 0x3) << 6 | v[:, :, 3]), axis=2).reshape(n, 9)
+    numBytes = (c != 0).sum(axis=1) // 4 * 3 - (c == ord("=")).sum(axis=1)
+    if np.any(numBytes > 8):
+        raise ValueError("frm_payload longer than 8 bytes")
+
+    src = np.arange(8) - (8 - numBytes)[:, None]
+    buf = np.where(src >= 0, b[np.arange(n)[:, None], np.maximum(src, 0)], 0).astype(np.uint8)
+    a = np.frombuffer(buf, "<u8")
+
+    # Same rounding as int(a / 2**32)
+    return ((a >> 32) + (a & 0xffffffff) / 2**32).astype(np.int64)
+
+def _convTimes(strings):
+    # conv_timestamp_ns_array() with None (missing) -> -1
+    missing = [t == None for t in strings]
+    ns = conv_timestamp_ns_array([("1970-01-01T00:00:00Z" if t == None else t) for t in strings])
+    return np.where(missing, -1, ns)
+
+def _flushGateway(gw):
+    for name in ("time", "gpsTime"):
+        if len(gw[name + "Str"]) > 0:
+            gw[name + "Ns"].extend(_convTimes(gw[name + "Str"]))
+            gw[name + "Str"] = []
+
+def readGateways(data):
+    # Parse uplinks into columns for every gateway in one pass
+    # data can be any iterable of uplinks, e.g. ingest.iterUplinks()
+    # Returns {"uplinks": {...}, "gateways": {eui: {...}}}, each gateway
+    # column "row" points to the uplink the gateway received
+    loraMsgId = array.array("q")
+    onAirTime = array.array("d")
+    onAirTimeNs = array.array("q")
+    nwNs = array.array("q")
+    payloadRaw = array.array("q")
+    gateways = {}
+
+    # Timestamp strings and payloads are converted in blocks
+    nwTime = []
+    payloads = []
+
+    for element in data:
+        uplink = element["result"]["uplink_message"]
+        row = len(loraMsgId)
+
+        loraMsgId.append(uplink["f_cnt"])
+        onAirTime.append(float(uplink["consumed_airtime"][:-1]))
+        onAirTimeNs.append(conv_duration_ns(uplink["consumed_airtime"]))
+        nwTime.append(element["result"]["received_at"])
+
+        payloads.append(uplink["frm_payload"])
+
+        if len(nwTime) >= PARSE_BLOCK:
+            nwNs.extend(conv_timestamp_ns_array(nwTime))
+            payloadRaw.extend(decodePayloadArray(payloads))
+            nwTime = []
+            payloads = []
+
+        for rx in uplink["rx_metadata"]:
+            eui = rx["gateway_ids"]["eui"]
+            if not eui in gateways:
+                gateways[eui] = {
+                    "row": array.array("q"),
+                    "timestamp": array.array("q"),
+                    "timeNs": array.array("q"), "timeStr": [],
+                    "gpsTimeNs": array.array("q"), "gpsTimeStr": [],
+                    "rssi": array.array("d"),
+                    "snr": array.array("d"),
+                    "channel": array.array("q"),
+                }
+            gw = gateways[eui]
+
+            gw["row"].append(row)
+            gw["timestamp"].append(int(rx.get("timestamp", -1)))
+            gw["timeStr"].append(rx.get("time"))
+            gw["gpsTimeStr"].append(rx.get("gps_time"))
+            gw["channel"].append(int(rx.get("channel_index", -1)))
+
+            # Same as readGw(), snr is dropped if rssi can't be read
+            try:
+                r = float(rx["rssi"])
+            except:
+                r = None
+            try:
+                s = float(rx["snr"]) if r != None else None
+            except:
+                s = None
+            gw["rssi"].append(np.nan if r == None else r)
+            gw["snr"].append(np.nan if s == None else s)
+
+            if len(gw["timeStr"]) >= PARSE_BLOCK:
+                _flushGateway(gw)
+
+    if len(nwTime) > 0:
+        nwNs.extend(conv_timestamp_ns_array(nwTime))
+        payloadRaw.extend(decodePayloadArray(payloads))
+
+    index = {
+        "uplinks": {
+            "loraMsgId": np.frombuffer(loraMsgId, np.int64),
+            "onAirTime": np.frombuffer(onAirTime, float),
+            "onAirTimeNs": np.frombuffer(onAirTimeNs, np.int64),
+            "nwNs": np.frombuffer(nwNs, np.int64),
+            "payloadRaw": np.frombuffer(payloadRaw, np.int64),
+        },
+        "gateways": {},
+    }
+
+    for eui, gw in gateways.items():
+        _flushGateway(gw)
+        index["gateways"][eui] = {
+            "row": np.frombuffer(gw["row"], np.int64),
+            "timestamp": np.frombuffer(gw["timestamp"], np.int64),
+            "timeNs": np.frombuffer(gw["timeNs"], np.int64),
+            "gpsTimeNs": np.frombuffer(gw["gpsTimeNs"], np.int64),
+            "rssi": np.frombuffer(gw["rssi"], float),
+            "snr": np.frombuffer(gw["snr"], float),
+            "channel": np.frombuffer(gw["channel"], np.int64),
+        }
+
+    return index
+
+def selectGateway(index, gw_eui="58A0CBFFFE802A21"):
+    # Columns of all uplinks received by gw_eui, as used by decodeColumns()
+    # Uplinks without a gateway time are dropped like not received ones
+    if gw_eui in index["gateways"]:
+        gw = index["gateways"][gw_eui]
+    else:
+        gw = {name: np.zeros(0, np.int64) for name in ("row", "timestamp", "timeNs", "rssi", "snr")}
+
+    # Only the first entry of a gateway per uplink counts, like readGw()
+    rows, first = np.unique(gw["row"], return_index=True)
+    keep = first[gw["timeNs"][first] != -1]
+    rows = gw["row"][keep]
+
+    uplinks = index["uplinks"]
+    cols = {
+        "loraMsgId": uplinks["loraMsgId"][rows],
+        "onAirTime": uplinks["onAirTime"][rows],
+        "onAirTimeNs": uplinks["onAirTimeNs"][rows],
+        "modemRaw": gw["timestamp"][keep],
+        "gwNs": gw["timeNs"][keep],
+        "nwNs": uplinks["nwNs"][rows],
+        "payloadRaw": uplinks["payloadRaw"][rows],
+        "rssi": np.asarray(gw["rssi"], float)[keep],
+        "snr": np.asarray(gw["snr"], float)[keep],
+    }
+
+    cols["modemUs"], cols["modemReset"] = unwrapUs(cols["modemRaw"], cols["gwNs"])
+    cols["modemSeconds"] = np.where(cols["modemRaw"] < 0, np.nan, (cols["modemRaw"] * 1000 - cols["onAirTimeNs"]) / 10**9)
+    cols["gwRaw"] = cols["gwNs"] / 10**9
+    cols["gwSeconds"] = cols["gwRaw"] - cols["onAirTime"]
+    cols["nwRaw"] = cols["nwNs"] / 10**9
+    cols["nwSeconds"] = cols["nwRaw"] - cols["onAirTime"]
+    cols["payloadSeconds"] = cols["payloadRaw"] / 1000
+
+    return cols
+
+def readColumns(data, gw_eui="58A0CBFFFE802A21"):
+    # Parse uplinks into columns, uplinks not received by gw_eui are dropped
+    return selectGateway(readGateways(data), gw_eui)
+
+def _sliceSymbols(delta, tol, bits):
+    # Vectorized _sliceSymbol(), returns -1 where no symbol could be found
+    i = np.maximum(np.ceil(delta - tol), 0)
+    hit = (i < 2**bits) & (delta - i >= -tol)
+
+    return np.where(hit, i, -1).astype(np.int64)
+
+def extractSymbolArray(deltaTimestamp, nominal, phaseDelta, tolerance, bits):
+    delta = np.abs(deltaTimestamp-nominal)/phaseDelta
+    tol = tolerance/phaseDelta
+
+    if bits == 1:
+        symbol = np.where((delta >= -tol) & (delta <= tol), 0, 1)
+        return np.where(np.isnan(delta), -1, symbol)
+
+    return _sliceSymbols(delta, tol, bits)
+
+def extractSymbolArray_ss(deltaTimestamp, nominal, phaseDelta, tolerance, bits, spreadingDelay, prevSpreadingDelay):
+    deltaDespread = deltaTimestamp - spreadingDelay + prevSpreadingDelay
+
+    delta = np.abs(deltaDespread-nominal)/phaseDelta
+    tol = tolerance/phaseDelta
+
+    return [_sliceSymbols(delta, tol, bits), deltaDespread]
+
+def extractSymbolArray_ecc(deltaTimestamp, nominal, phaseDelta, tolerance, bits):
+    # Vectorized extractSymbol_ecc(), -1 marks None
+    _checkEccBits(bits)
+    symbol = extractSymbolArray(deltaTimestamp, nominal, phaseDelta, tolerance, bits*2)
+
+    return decodeHamming84Array(symbol)
+
+def decodeColumns(cols, nominal, tolerance, phaseDelta, bits, watermarkShift=13, gw_ts_name="gwTs", spreading=False, spreadingSeed=int("BEEF", 16), ecc=False):
+    # Calculate loss, IPDs, watermarks and symbols for parsed columns
+    n = len(cols["loraMsgId"])
+    res = {}
+
+    # Check if a frame was lost, first message is handled like a lost message
+    numLost = np.ones(n, np.int64)
+    numLost[1:] = np.diff(cols["loraMsgId"]) - 1
+    res["numLost"] = numLost
+
+    # IPDs and watermarks are only valid for subsequent messages
+    valid = numLost == 0
+    valid[:1] = False
+    res["valid"] = valid
+
+    for name, seconds in (("modemTs", "modemSeconds"), ("gwTs", "gwSeconds"), ("nwTs", "nwSeconds"), ("payload", "payloadSeconds")):
+        delta = np.full(n, np.nan)
+        if n > 1:
+            if name == "modemTs":
+                # Exact in integer nanoseconds, unknown across a counter reset
+                ns = cols["modemUs"] * 1000 - cols["onAirTimeNs"]
+                delta[1:] = np.where(cols["modemReset"][1:], np.nan, (ns[1:] - ns[:-1]) / 10**9)
+            elif name == "gwTs" or name == "nwTs":
+                # Exact in integer nanoseconds, rounded only once
+                ns = cols[name[:2] + "Ns"] - cols["onAirTimeNs"]
+                delta[1:] = (ns[1:] - ns[:-1]) / 10**9
+            else:
+                delta[1:] = cols[seconds][1:] - cols[seconds][:-1]
+        res[name + "Delta"] = np.where(valid, delta, np.nan)
+
+    watermark = np.full(n, -1, np.int64)
+    if n > 1:
+        watermark[1:] = calcWatermark(cols["payloadRaw"][:-1], cols["payloadRaw"][1:], shift=watermarkShift)
+    watermark = np.where(valid, watermark, -1)
+    res["watermark"] = watermark
+    res["calcEffWatermark"] = np.where(valid, calcEffWatermark(watermark, bits), -1)
+
+    tsDelta = res[gw_ts_name + "Delta"]
+    res["despreaded"] = np.full(n, np.nan)
+    res["eccErrors"] = np.full(n, -1, np.int64)
+
+    if spreading:
+        res["spreadingSequence"], res["spreadingDelay"] = getSpreadingParamArray(cols["loraMsgId"], spreadingSeed, 2**bits * phaseDelta * 1000)
+        prevDelay = np.concatenate(([np.nan], res["spreadingDelay"][:-1]))
+        symbol, despreaded = extractSymbolArray_ss(tsDelta, nominal, phaseDelta, tolerance, bits, res["spreadingDelay"], prevDelay)
+        res["despreaded"] = np.where(valid, despreaded, np.nan)
+    elif ecc:
+        res["eccErrors"], symbol = extractSymbolArray_ecc(tsDelta, nominal, phaseDelta, tolerance, bits)
+    else:
+        symbol = extractSymbolArray(tsDelta, nominal, phaseDelta, tolerance, bits)
+    symbol = np.where(valid, symbol, -1)
+    res["symbol"] = symbol
+
+    effWatermark = np.full(n, -1, np.int64)
+    if bits == 1:
+        # Due to DPSK modulation, for 1 bit another subsequent message is needed
+        counted = valid.copy()
+        counted[1:] &= numLost[:-1] == 0
+        both = counted.copy()
+        both[1:] &= (symbol[:-1] >= 0) & (symbol[1:] >= 0)
+        effWatermark[1:] = np.where(both[1:], symbol[:-1] ^ symbol[1:], -1)
+    else:
+        counted = valid
+        effWatermark = symbol.copy()
+    res["effWatermark"] = np.where(counted, effWatermark, -1)
+    res["counted"] = counted
+
+    res["symbolCorrect"] = counted & (res["effWatermark"] == res["calcEffWatermark"]) & (res["effWatermark"] >= 0)
+
+    res["numMsgsLost"] = int(numLost[1:].sum())
+    res["numSymbolsPossible"] = int(counted.sum())
+    res["numSymbolErrors"] = int((counted & ~res["symbolCorrect"]).sum())
+    res["ecc"] = {
+        "dualBit": int((valid & (res["eccErrors"] == 2)).sum()),
+        "singleBit": int((valid & (res["eccErrors"] == 1)).sum()),
+        "noErr": int((valid & (res["eccErrors"] == 0)).sum()),
+    }
+
+    return res
+
+# Columnar message store
+# Same logical fields as template_msg, but every field is one typed numpy
+# array ("gwTs.delta", "payload.raw", ...). Missing values are NaN for float
+# and -1 for int columns. Rows are cheap views which behave like the nested
+# message dicts, so msgs[i]["gwTs"]["delta"] works as before, while
+# msgs.column("gwTs.delta") gives the whole column without any copy.
+
+MSG_FIELDS = [
+    # name, dtype, missing
+    ["numLost", np.int64, None],
+    ["loraMsgId", np.int64, None],
+    ["rssi", float, np.nan],
+    ["snr", float, np.nan],
+    ["modemTs.raw", np.int64, -1],
+    ["modemTs.seconds", float, np.nan],
+    ["modemTs.despreaded", float, np.nan],
+    ["modemTs.delta", float, np.nan],
+    ["gwTs.raw", float, np.nan],
+    ["gwTs.seconds", float, np.nan],
+    ["gwTs.despreaded", float, np.nan],
+    ["gwTs.delta", float, np.nan],
+    ["nwTs.raw", float, np.nan],
+    ["nwTs.seconds", float, np.nan],
+    ["nwTs.despreaded", float, np.nan],
+    ["nwTs.delta", float, np.nan],
+    ["payload.raw", np.int64, -1],
+    ["payload.delta", float, np.nan],
+    ["payload.seconds", float, np.nan],
+    ["payload.secondsDelta", float, np.nan],
+    ["calculation.watermark", np.int64, -1],
+    ["calculation.effWatermark", np.int64, -1],
+    ["extraction.symbol", np.int64, -1],
+    ["extraction.effWatermark", np.int64, -1],
+    ["extraction.eccErrors", np.int64, -1],
+    ["spreading.sequence", np.int64, -1],
+    ["spreading.delay", float, np.nan],
+    ["symbolCorrect", np.int8, -1],
+]
+
+class MessageTable:
+    def __init__(self, n, columns=None):
+        if columns is None:
+            columns = {}
+
+        self.n = n
+        self.columns = {}
+        self.missing = {}
+
+        for name, dtype, missing in MSG_FIELDS:
+            self.missing[name] = missing
+            if name in columns:
+                self.columns[name] = np.asarray(columns[name], dtype)
+            else:
+                self.columns[name] = np.full(n, 0 if missing is None else missing, dtype)
+
+        self.groups = {}
+        for name in self.columns:
+            if "." in name:
+                group, key = name.split(".")
+                self.groups.setdefault(group, []).append(key)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+
+        if key < 0:
+            key += self.n
+        if key < 0 or key >= self.n:
+            raise IndexError("message index out of range")
+        return MessageRow(self, key)
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield MessageRow(self, i)
+
+    def column(self, name):
+        return self.columns[name]
+
+    def value(self, name, i):
+        v = self.columns[name][i].item()
+
+        if name == "symbolCorrect":
+            return None if v < 0 else bool(v)
+        if v != v or (v == self.missing[name] and self.missing[name] is not None):
+            return None
+        return v
+
+    def setValue(self, name, i, value):
+        if not name in self.columns:
+            # Unknown fields are added as float columns
+            self.columns[name] = np.full(self.n, np.nan)
+            self.missing[name] = np.nan
+            if "." in name:
+                group, key = name.split(".")
+                self.groups.setdefault(group, []).append(key)
+        if value == None:
+            value = self.missing[name]
+        self.columns[name][i] = value
+
+    def toList(self):
+        # Old format, a list of nested message dicts
+        return list(row.toDict() for row in self)
+
+class MessageGroup:
+    # View of a sub-dict (e.g. "gwTs") of one message
+    def __init__(self, table, i, group):
+        self.table = table
+        self.i = i
+        self.group = group
+
+    def __getitem__(self, key):
+        return self.table.value(self.group + "." + key, self.i)
+
+    def __setitem__(self, key, value):
+        self.table.setValue(self.group + "." + key, self.i, value)
+
+    def keys(self):
+        return self.table.groups[self.group]
+
+    def toDict(self):
+        return {key: self[key] for key in self.keys()}
+
+class MessageRow:
+    # View of one message of a MessageTable
+    def __init__(self, table, i):
+        self.table = table
+        self.i = i
+
+    def __getitem__(self, key):
+        if key in self.table.groups:
+            return MessageGroup(self.table, self.i, key)
+        return self.table.value(key, self.i)
+
+    def __setitem__(self, key, value):
+        self.table.setValue(key, self.i, value)
+
+    def keys(self):
+        return list(name for name in self.table.columns if not "." in name) + list(self.table.groups)
+
+    def toDict(self):
+        msg = {}
+        for key in self.keys():
+            if key in self.table.groups:
+                msg[key] = MessageGroup(self.table, self.i, key).toDict()
+            else:
+                msg[key] = self[key]
+        return msg
+
+def getColumn(msgs, name):
+    # Column of a MessageTable or of a list of message dicts as float array
+    if isinstance(msgs, MessageTable):
+        return np.asarray(msgs.column(name), float)
+
+    group, _, key = name.partition(".")
+    if key:
+        return np.array(list(ele[group][key] for ele in msgs), float)
+    return np.array(list(ele[group] for ele in msgs), float)
+
+def buildMessageTable(cols, res, gw_ts_name="gwTs", spreading=False):
+    columns = {
+        "numLost": res["numLost"],
+        "loraMsgId": cols["loraMsgId"],
+        "rssi": cols["rssi"],
+        "snr": cols["snr"],
+        "modemTs.raw": cols["modemRaw"],
+        "modemTs.seconds": cols["modemSeconds"],
+        "modemTs.delta": res["modemTsDelta"],
+        "gwTs.raw": cols["gwRaw"],
+        "gwTs.seconds": cols["gwSeconds"],
+        "gwTs.delta": res["gwTsDelta"],
+        "nwTs.raw": cols["nwRaw"],
+        "nwTs.seconds": cols["nwSeconds"],
+        "nwTs.delta": res["nwTsDelta"],
+        "payload.raw": cols["payloadRaw"],
+        "payload.delta": res["payloadDelta"],
+        "payload.seconds": cols["payloadSeconds"],
+        "calculation.watermark": res["watermark"],
+        "calculation.effWatermark": res["calcEffWatermark"],
+        "extraction.symbol": res["symbol"],
+        "extraction.effWatermark": res["effWatermark"],
+        "extraction.eccErrors": res["eccErrors"],
+        "symbolCorrect": np.where(res["counted"], res["symbolCorrect"], -1),
+    }
+    columns[gw_ts_name + ".despreaded"] = res["despreaded"]
+
+    if spreading:
+        columns["spreading.sequence"] = res["spreadingSequence"]
+        columns["spreading.delay"] = res["spreadingDelay"]
+
+    return MessageTable(len(cols["loraMsgId"]), columns)
+
+def printMessages(msgs, printMatches, gw_ts_name="gwTs"):
+    # Same output as readMessages(), only reported messages are visited
+    report = msgs.column("numLost") != 0
+    report |= msgs.column("symbolCorrect") == 0
+    if printMatches:
+        report |= msgs.column("symbolCorrect") == 1
+    report[:1] = True
+
+    for i in np.flatnonzero(report):
+        msg = msgs[i]
+        # The modem counter may be missing
+        ts = "unknown" if msg[gw_ts_name]["seconds"] == None else "{0:.3f} s".format(msg[gw_ts_name]["seconds"])
+        if i == 0:
+            print("ID: {0}".format(msg["loraMsgId"]))
+            print("\tFirst message")
+            print("\tGW   TS: {0}".format(ts))
+            print("\tPAYLOAD: {0}".format(msg["payload"]["raw"]))
+        elif msg["numLost"] != 0:
+            print("ID: {0}".format(msg["loraMsgId"]))
+            print("\t{0} frame(s) after ID {1} lost".format(msg["numLost"], msgs[i-1]["loraMsgId"]))
+            print("\tGW   TS: {0}".format(ts))
+            print("\tPAYLOAD: {0}".format(msg["payload"]["raw"]))
+        elif msg["symbolCorrect"] == False:
+            print("ID: {0}".format(msg["loraMsgId"]))
+            print("\tGW   TS: {0}".format(ts))
+            print("\tPAYLOAD: {0}".format(msg["payload"]["raw"]))
+            print("\tCalculated Watermark: 0x{0:x}, effWatermark: 0x{1:x}".format(msg["calculation"]["watermark"], msg["calculation"]["effWatermark"]))
+            print("\tExtracted Symbol: {0}, effWatermark: {1}".format(msg["extraction"]["symbol"], msg["extraction"]["effWatermark"]))
+            print("\teffWatermark does not match!")
+        else:
+            print("ID: {0}".format(msg["loraMsgId"]))
+            print("\tGW   TS: {0}".format(ts))
+            print("\tPAYLOAD: {0}".format(msg["payload"]["raw"]))
+            print("\tCalculated Watermark: 0x{0:x}, effWatermark: 0x{1:x}".format(msg["calculation"]["watermark"], msg["calculation"]["effWatermark"]))
+            print("\tExtracted Symbol: 0x{0:x}, effWatermark: 0x{1:x}".format(msg["extraction"]["symbol"], msg["extraction"]["effWatermark"]))
+            print("\teffWatermark match!")
+
+def decodeMessages(cols, nominal, tolerance, phaseDelta, bits, printMatches, watermarkShift=13, gw_ts_name="gwTs", spreading=False, spreadingSeed=int("BEEF", 16), ecc=False):
+    # Decode parsed columns, returns the same dict as readMessages()
+    res = decodeColumns(cols, nominal, tolerance, phaseDelta, bits, watermarkShift, gw_ts_name, spreading, spreadingSeed, ecc)
+    msgs = buildMessageTable(cols, res, gw_ts_name, spreading)
+    printMessages(msgs, printMatches, gw_ts_name)
+
+    return {"msgs": msgs, "numMsgsLost": res["numMsgsLost"], "numSymbolsPossible": res["numSymbolsPossible"], "numSymbolErrors": res["numSymbolErrors"], "ecc": res["ecc"]}
+
+def readMessagesBatch(data, nominal, tolerance, phaseDelta, bits, printMatches, watermarkShift=13, gw_eui="58A0CBFFFE802A21", gw_ts_name="gwTs", spreading=False, spreadingSeed=int("BEEF", 16), ecc=False):
+    # Drop-in replacement for readMessages()
+    # data can also be the path of a measurement file, which is then
+    # decoded through the on-disk cache
+    if isinstance(data, str):
+        import cache
+        return cache.readMessagesFile(data, nominal, tolerance, phaseDelta, bits, printMatches, watermarkShift, gw_eui, gw_ts_name, spreading, spreadingSeed, ecc)
+
+    cols = readColumns(data, gw_eui)
+    return decodeMessages(cols, nominal, tolerance, phaseDelta, bits, printMatches, watermarkShift, gw_ts_name, spreading, spreadingSeed, ecc)
+
+def readMessagesGateways(data, nominal, tolerance, phaseDelta, bits, printMatches, watermarkShift=13, gw_euis=None, gw_ts_name="gwTs", spreading=False, spreadingSeed=int("BEEF", 16), ecc=False):
+    # Decode against several gateways from one pass over the uplinks
+    # Returns {eui: same dict as readMessages()} for gw_euis or all gateways
+    # data can be uplinks, a path or an index of readGateways()
+    if isinstance(data, str):
+        import cache
+        index = cache.readGatewaysFile(data)
+    elif isinstance(data, dict):
+        index = data
+    else:
+        index = readGateways(data)
+
+    if gw_euis == None:
+        gw_euis = list(index["gateways"])
+
+    res = {}
+    for eui in gw_euis:
+        res[eui] = decodeMessages(selectGateway(index, eui), nominal, tolerance, phaseDelta, bits, printMatches, watermarkShift, gw_ts_name, spreading, spreadingSeed, ecc)
+    return res
+
+# Streaming decoder
+# Decodes one uplink at a time as it arrives. Only the state of the previous
+# message is kept, the decisions are the same as readMessagesBatch().
+
+class StreamingDecoder:
+    def __init__(self, nominal, tolerance, phaseDelta, bits, watermarkShift=13, gw_eui="58A0CBFFFE802A21", gw_ts_name="gwTs", spreading=False, spreadingSeed=int("BEEF", 16), ecc=False):
+        self.nominal = nominal
+        self.tolerance = tolerance
+        self.phaseDelta = phaseDelta
+        self.bits = bits
+        self.watermarkShift = watermarkShift
+        self.gw_eui = gw_eui
+        self.gw_ts_name = gw_ts_name
+        self.spreading = spreading
+        self.spreadingSeed = spreadingSeed
+        self.ecc = ecc
+
+        self.numMsgsLost = 0
+        self.numSymbolsPossible = 0
+        self.numSymbolErrors = 0
+        self.eccCount = {"dualBit": 0, "singleBit": 0, "noErr": 0}
+
+        # State of the previous message, None before the first one
+        self.prev = None
+
+    def push(self, element):
+        # Decode one uplink, returns an event dict or None if the uplink was
+        # not received by the gateway
+        # event["event"] is one of:
+        #   "first"    first message
+        #   "lost"     frames before this one were lost
+        #   "pending"  1 bit DPSK, the symbol needs another subsequent message
+        #   "match"    extracted symbol matches the watermark
+        #   "mismatch" extracted symbol does not match the watermark
+        uplink = element["result"]["uplink_message"]
+
+        rx = None
+        for gw in uplink["rx_metadata"]:
+            if gw["gateway_ids"]["eui"] == self.gw_eui:
+                rx = gw
+                break
+        if rx is None or not "time" in rx:
+            # Same as readGateways(), not received by this gateway
+            return None
+
+        onAirTimeNs = conv_duration_ns(uplink["consumed_airtime"])
+        gwNs = conv_timestamp_ns(rx["time"])
+
+        cur = {
+            "loraMsgId": uplink["f_cnt"],
+            "modemRaw": int(rx.get("timestamp", -1)),
+            "gwNs": gwNs,
+            "onAirTimeNs": onAirTimeNs,
+            "gwTs": gwNs - onAirTimeNs,
+            "nwTs": conv_timestamp_ns(element["result"]["received_at"]) - onAirTimeNs,
+            "payloadRaw": decodePayload(uplink["frm_payload"]),
+            "symbol": None,
+            "spreadingDelay": None,
+        }
+        if self.spreading:
+            cur["spreadingDelay"] = getSpreadingParam(cur["loraMsgId"], self.spreadingSeed, 2**self.bits * self.phaseDelta * 1000)[1]
+
+        event = {
+            "event": None,
+            "loraMsgId": cur["loraMsgId"],
+            "numLost": 1,
+            "delta": None,
+            "despreaded": None,
+            "watermark": None,
+            "calcEffWatermark": None,
+            "symbol": None,
+            "eccErrors": None,
+            "effWatermark": None,
+            "symbolCorrect": None,
+        }
+
+        prev = self.prev
+        self.prev = cur
+
+        if prev is None:
+            # First message -> Handle like a lost message
+            cur["numLost"] = 1
+            event["event"] = "first"
+            return event
+
+        cur["numLost"] = (cur["loraMsgId"] - prev["loraMsgId"]) - 1
+        event["numLost"] = cur["numLost"]
+        self.numMsgsLost += cur["numLost"]
+
+        if cur["numLost"] != 0:
+            event["event"] = "lost"
+            return event
+
+        if self.gw_ts_name == "modemTs":
+            # Same as decodeColumns()
+            step, reset = usSteps(prev["modemRaw"], cur["modemRaw"], (cur["gwNs"] - prev["gwNs"]) // 1000)
+            delta = None
+            if not reset:
+                delta = (int(step) * 1000 - (cur["onAirTimeNs"] - prev["onAirTimeNs"])) / 10**9
+        else:
+            # Exact in integer nanoseconds, rounded only once
+            delta = (cur[self.gw_ts_name] - prev[self.gw_ts_name]) / 10**9
+        event["delta"] = delta
+
+        event["watermark"] = calcWatermark(prev["payloadRaw"], cur["payloadRaw"], shift=self.watermarkShift)
+        event["calcEffWatermark"] = calcEffWatermark(event["watermark"], self.bits)
+
+        if delta is None:
+            # Counter reset, no symbol like in decodeColumns()
+            cur["symbol"] = None
+        elif self.spreading:
+            cur["symbol"], event["despreaded"] = extractSymbol_ss(delta, self.nominal, self.phaseDelta, self.tolerance, self.bits, cur["spreadingDelay"], prev["spreadingDelay"])
+        elif self.ecc:
+            event["eccErrors"], cur["symbol"] = extractSymbol_ecc(delta, self.nominal, self.phaseDelta, self.tolerance, self.bits)
+            if (event["eccErrors"] == 0):
+                self.eccCount["noErr"] += 1
+            elif (event["eccErrors"] == 1):
+                self.eccCount["singleBit"] += 1
+            elif (event["eccErrors"] == 2):
+                self.eccCount["dualBit"] += 1
+        else:
+            cur["symbol"] = extractSymbol(delta, self.nominal, self.phaseDelta, self.tolerance, self.bits)
+        event["symbol"] = cur["symbol"]
+
+        if (self.bits == 1):
+            # Due to DPSK modulation, for 1 bit another subsequent message is needed
+            if (prev["numLost"] != 0):
+                event["event"] = "pending"
+                return event
+            if (prev["symbol"] != None and cur["symbol"] != None):
+                event["effWatermark"] = prev["symbol"] ^ cur["symbol"]
+        else:
+            event["effWatermark"] = cur["symbol"]
+
+        self.numSymbolsPossible += 1
+        event["symbolCorrect"] = event["effWatermark"] != None and event["effWatermark"] == event["calcEffWatermark"]
+
+        if event["symbolCorrect"]:
+            event["event"] = "match"
+        else:
+            event["event"] = "mismatch"
+            self.numSymbolErrors += 1
+
+        return event
+
+    def result(self):
+        # Counters like readMessages(), without the messages
+        return {"numMsgsLost": self.numMsgsLost, "numSymbolsPossible": self.numSymbolsPossible, "numSymbolErrors": self.numSymbolErrors, "ecc": dict(self.eccCount)}
+
 def xorshift(lfsr):
     # Hattip to: http://www.retroprogramming.com/2017/07/xorshift-pseudorandom-numbers-in-z80.html
     lfsr ^= ( lfsr << 7 ) % 2**16
@@ -336,12 +1188,8 @@ def xorshift(lfsr):
 def printCalculations(res):
     msgs = res["msgs"]
     # Show calculations
-    y1 = []
-    for ele in msgs:
-        if not (ele["gwTs"]["delta"] == None):
-            y1.append(ele["gwTs"]["delta"]*1000)
-
-    y1 = np.array(y1)
+    y1 = getColumn(msgs, "gwTs.delta")
+    y1 = y1[~np.isnan(y1)]*1000
 
     msgsSent = msgs[-1]["loraMsgId"]+1
 
@@ -360,14 +1208,10 @@ def printCalculations(res):
     print("Duration: {0}h".format((msgs[-1]["gwTs"]["seconds"] - msgs[0]["gwTs"]["seconds"])/(60*60)))
 
     # Read SNR/RSSI
-    snr = []
-    rssi = []
-
-    for ele in msgs:
-        if ele["snr"] != None:
-            snr.append(ele["snr"])
-        if ele["rssi"] != None:
-            rssi.append(ele["rssi"])
+    snr = getColumn(msgs, "snr")
+    snr = snr[~np.isnan(snr)]
+    rssi = getColumn(msgs, "rssi")
+    rssi = rssi[~np.isnan(rssi)]
 
     print("SNR:")
     print("\tmin: {0} dB".format(np.min(snr)))
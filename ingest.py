@@ -0,0 +1,143 @@
+import json
+import os
+import heapq
+
+# Streaming reader for measurement files
+# Yields one uplink (dict) at a time, so decoding starts right away and the
+# memory used does not depend on the file size. Two formats are supported:
+# 1) A json list of uplinks, as written by combine.py and sort.py
+# 2) Raw json lines as downloaded from TTN, one uplink per line
+# A directory is read as measurement store, see store.py
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+def _iterArray(f, buf):
+    # buf holds everything read after the opening "["
+    pos = 0
+    eof = False
+
+    while True:
+        # Skip whitespace and separators
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos < len(buf) and buf[pos] == "]":
+            return
+
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("Unexpected end of json list")
+            buf = f.read(CHUNK_SIZE)
+            pos = 0
+            eof = len(buf) == 0
+            continue
+
+        try:
+            element, end = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Element is not complete yet, read more
+            if eof:
+                raise
+            more = f.read(CHUNK_SIZE)
+            eof = len(more) == 0
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+
+        # A number, true, false or null is only complete if followed by a
+        # separator, otherwise it might continue in the next chunk
+        if not eof and not isinstance(element, (dict, list, str)) and (end == len(buf) or not buf[end] in " \t\r\n,]"):
+            more = f.read(CHUNK_SIZE)
+            eof = len(more) == 0
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+
+        yield element
+        pos = end
+
+        # Drop consumed input from time to time
+        if pos > CHUNK_SIZE:
+            buf = buf[pos:]
+            pos = 0
+
+def _iterLines(f, first):
+    for line in _chain(first, f):
+        line = line.strip()
+        if line == "":
+            continue
+        yield json.loads(line)
+
+def _chain(first, f):
+    # first is the already read start of the first line
+    yield first + f.readline()
+    for line in f:
+        yield line
+
+def iterUplinks(path):
+    if os.path.isdir(path):
+        import store
+        yield from store.iterUplinks(path)
+        return
+
+    with open(path, "r") as f:
+        # Find the first non whitespace character to detect the format
+        c = f.read(1)
+        while c != "" and c.isspace():
+            c = f.read(1)
+
+        if c == "":
+            return
+        elif c == "[":
+            yield from _iterArray(f, "")
+        else:
+            yield from _iterLines(f, c)
+
+def writeUplinks(path, uplinks):
+    # Write uplinks as json list, same format as json.dumps(list)
+    # The file is written to a temporary file first and then moved over path,
+    # so path is never left half written. Returns the number of uplinks.
+    tmp = path + ".tmp"
+    n = 0
+    try:
+        with open(tmp, "w") as f:
+            f.write("[")
+            for element in uplinks:
+                if n > 0:
+                    f.write(", ")
+                f.write(json.dumps(element))
+                n += 1
+            f.write("]")
+    except:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    return n
+
+def fcntKey(element):
+    # TTN leaves out f_cnt if it is 0
+    return element["result"]["uplink_message"].get("f_cnt", 0)
+
+def uplinkKey(element):
+    # Uplinks with the same key are duplicates
+    result = element["result"]
+    return (result["end_device_ids"].get("dev_eui"), result["uplink_message"].get("f_cnt"), result["received_at"])
+
+def mergeUplinks(streams, key=fcntKey):
+    # k-way merge of streams which are already sorted by key, duplicates are
+    # dropped. Only the uplinks with the current key are held in memory.
+    # Equal keys keep the order of the streams, like a stable sort.
+    head = None
+    seen = set()
+    for element in heapq.merge(*streams, key=key):
+        k = key(element)
+        if k != head:
+            head = k
+            seen = set()
+
+        k = uplinkKey(element)
+        if not k in seen:
+            seen.add(k)
+            yield element
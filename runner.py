@@ -0,0 +1,83 @@
+import io
+import os
+import sys
+import contextlib
+
+import experiments
+
+# Decode several measurements in parallel
+# Every measurement is decoded in its own worker process. Only a small
+# summary is sent back instead of the messages, the decoded messages stay in
+# the on-disk cache (see cache.py), so a following analyze() of the same
+# measurement is fast. Summaries are kept for the whole process, keyed like
+# the cache, so asking for the same measurement again starts no worker.
+# Nothing of matplotlib is imported, see experiments.py.
+
+# cache key -> summary
+_summaries = {}
+
+def summarize(res):
+    # Counters of a result of readMessages(), in percent where useful
+    numMsgs = len(res["msgs"])
+
+    summary = {
+        "numMsgs": numMsgs,
+        "numMsgsLost": res["numMsgsLost"],
+        "numSymbolsPossible": res["numSymbolsPossible"],
+        "numSymbolErrors": res["numSymbolErrors"],
+        "ecc": res["ecc"],
+        "packetLoss": None,
+        "ber": None,
+    }
+
+    if numMsgs > 0:
+        summary["packetLoss"] = (res["numMsgsLost"] / numMsgs) * 100
+    if res["numSymbolsPossible"] > 0:
+        summary["ber"] = (res["numSymbolErrors"] / res["numSymbolsPossible"]) * 100
+
+    return summary
+
+def _run(name):
+    # Runs in the worker, the output is returned to be printed in order
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        summary = summarize(experiments.analyze(name))
+    return [summary, out.getvalue()]
+
+def runMeasurements(names=experiments.NAMES, workers=None, printLog=True):
+    # Returns {name: summary} in the order of names, see experiments.py
+    # workers defaults to the number of cores
+    keys = {name: experiments.cacheKey(name) for name in names}
+    todo = [name for name in names if not keys[name] in _summaries]
+
+    # Measurements already in the cache are only read, that is faster than
+    # starting a worker, only the others are decoded in workers
+    decode = [name for name in todo if not os.path.exists(keys[name])]
+
+    pool = None
+    futures = {}
+    if len(decode) > 0:
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(decode)))
+        futures = {name: pool.submit(_run, name) for name in decode}
+
+    try:
+        for name in todo:
+            if name in futures:
+                summary, log = futures[name].result()
+            else:
+                summary, log = _run(name)
+            if printLog:
+                sys.stdout.write(log)
+            _summaries[keys[name]] = summary
+    finally:
+        # After an error the remaining measurements are not decoded
+        if pool != None:
+            pool.shutdown(cancel_futures=True)
+
+    return {name: _summaries[keys[name]] for name in names}
+
+if __name__ == "__main__":
+    for name, summary in runMeasurements(printLog=False).items():
+        print("{0}: {1} msgs, {2} lost, {3} symbols, {4} errors".format(name, summary["numMsgs"], summary["numMsgsLost"], summary["numSymbolsPossible"], summary["numSymbolErrors"]))
@@ -1,32 +1,71 @@
+import os
 import sys
-import json
-import operator
+import heapq
+import tempfile
+
+import ingest
+
+# Number of uplinks sorted in memory at once, larger inputs are split into
+# sorted runs in temporary files which are merged afterwards
+RUN_SIZE = 100000
 
 if (len(sys.argv) < 3):
     print("Too less arguments!")
-    print("Use: python3 {0} in_file out_file".format(sys.argv[0]))
+    print("Use: python3 {0} in_file [in_file ...] out_file".format(sys.argv[0]))
+    print("     python3 {0} -m in_file [in_file ...] out_file".format(sys.argv[0]))
+    print("-m: in_files are already sorted by f_cnt and only merged")
     exit(1)
 
-try:
-    in_file = open(sys.argv[1], "r")
-    i_json = json.loads(in_file.read())
-    in_file.close()
-except OSError as e:
-    print("Can't read in_file")
-    exit(1)
+args = sys.argv[1:]
+merge_only = args[0] == "-m"
+if merge_only:
+    args = args[1:]
+in_files = args[:-1]
+out_file = args[-1]
+
+for f in in_files:
+    if not os.path.exists(f):
+        print("Can't read in_file")
+        exit(1)
+
+def readAll():
+    for f in in_files:
+        yield from ingest.iterUplinks(f)
+
+def spill(run, tmp_dir):
+    # Write one sorted run, sort() is stable like the merge
+    run.sort(key=ingest.fcntKey)
+    fd, path = tempfile.mkstemp(suffix=".json", dir=tmp_dir)
+    os.close(fd)
+    ingest.writeUplinks(path, run)
+    return path
 
-# Put f_cnt at top level for sorting
-for j in i_json:
-    j["f_cnt"] = j["result"]["uplink_message"]["f_cnt"]
+def merge(streams):
+    # Every uplink is kept, duplicates are only dropped by combine.py
+    # Equal f_cnt keep the order of the streams, like a stable sort
+    return heapq.merge(*streams, key=ingest.fcntKey)
 
-# Sorting
-i_json.sort(key=operator.itemgetter('f_cnt'))
+if merge_only:
+    streams = [ingest.iterUplinks(f) for f in in_files]
+    numOut = ingest.writeUplinks(out_file, merge(streams))
+else:
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(out_file))) as tmp_dir:
+        runs = []
+        run = []
+        for element in readAll():
+            run.append(element)
+            if len(run) >= RUN_SIZE:
+                runs.append(spill(run, tmp_dir))
+                run = []
 
-# Delte f_cnt at top level
-for j in i_json:
-    del j["f_cnt"]
+        if len(runs) == 0:
+            # Fits into memory, no need for temporary files
+            run.sort(key=ingest.fcntKey)
+            numOut = ingest.writeUplinks(out_file, run)
+        else:
+            if len(run) > 0:
+                runs.append(spill(run, tmp_dir))
+            streams = [ingest.iterUplinks(path) for path in runs]
+            numOut = ingest.writeUplinks(out_file, merge(streams))
 
-# Write to file
-out_file = open(sys.argv[2], "w")
-out_file.write(json.dumps(i_json))
-out_file.close()
+print("Sorted: {0}".format(numOut))
@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import contextlib
+
+import ingest
+
+# Append-only measurement store
+# A store is a directory with immutable segments (json lists of uplinks,
+# sorted by f_cnt) and a small manifest listing them. A new TTN export is
+# written as a new segment, so appending only costs the size of the export.
+# compact() merges all segments into one. Readers see all segments as one
+# f_cnt ordered stream of uplinks, duplicates are dropped while reading.
+#
+# Segments are never changed and the manifest is replaced atomically, so
+# compact() can run while others read the store. Every change of the
+# manifest is done holding LOCK_FILE, the segments themselves are written
+# without it: append() can add a segment while compact() merges, the
+# compacted segment only replaces the segments it merged. Segments replaced
+# by compact() are deleted by the next compact(), readers which already
+# started keep reading them until then.
+
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "lock"
+SEGMENT_NAME = "segment_{0:06d}.json"
+
+def sortKey(element):
+    result = element["result"]
+    return (result["uplink_message"].get("f_cnt", 0), result["received_at"])
+
+def readManifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r") as f:
+            manifest = json.loads(f.read())
+    except FileNotFoundError:
+        manifest = {"next": 0, "segments": []}
+    manifest.setdefault("obsolete", [])
+    return manifest
+
+@contextlib.contextmanager
+def _locked(directory):
+    # Held while the manifest is read, changed and written
+    # fcntl is only needed (and only available on POSIX) for writing a store
+    import fcntl
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _writeManifest(directory, manifest):
+    tmp = os.path.join(directory, MANIFEST_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(json.dumps(manifest, indent=1))
+    os.replace(tmp, os.path.join(directory, MANIFEST_FILE))
+
+def _reserveName(directory):
+    # Segment names are never used twice, even if writing one fails
+    with _locked(directory):
+        manifest = readManifest(directory)
+        name = SEGMENT_NAME.format(manifest["next"])
+        manifest["next"] += 1
+        _writeManifest(directory, manifest)
+    return name
+
+def _writeSegment(directory, uplinks):
+    # uplinks must already be sorted by sortKey()
+    name = _reserveName(directory)
+
+    segment = {"name": name, "count": 0, "first": None, "last": None}
+
+    def track():
+        for element in uplinks:
+            f_cnt = element["result"]["uplink_message"].get("f_cnt", 0)
+            if segment["first"] == None:
+                segment["first"] = f_cnt
+            segment["last"] = f_cnt
+            yield element
+
+    segment["count"] = ingest.writeUplinks(os.path.join(directory, name), track())
+    return segment
+
+def append(directory, path):
+    # Add a measurement file (TTN json lines or json list) as new segment
+    uplinks = sorted(ingest.iterUplinks(path), key=sortKey)
+    segment = _writeSegment(directory, uplinks)
+
+    with _locked(directory):
+        manifest = readManifest(directory)
+        manifest["segments"].append(segment)
+        _writeManifest(directory, manifest)
+    return segment
+
+def _merge(directory, segments):
+    # Duplicates have the same sortKey, mergeUplinks() drops them
+    streams = [ingest.iterUplinks(os.path.join(directory, segment["name"])) for segment in segments]
+    return ingest.mergeUplinks(streams, sortKey)
+
+def iterUplinks(directory):
+    # All uplinks of a store, ordered by f_cnt
+    manifest = readManifest(directory)
+    return _merge(directory, manifest["segments"])
+
+def compact(directory):
+    # Merge all segments into one, segments appended meanwhile are kept
+    # Segments replaced by the last compact() are deleted now
+    with _locked(directory):
+        manifest = readManifest(directory)
+        obsolete = manifest["obsolete"]
+        manifest["obsolete"] = []
+        _writeManifest(directory, manifest)
+
+    for name in obsolete:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+    old = manifest["segments"]
+    if len(old) < 2:
+        return
+
+    segment = _writeSegment(directory, _merge(directory, old))
+
+    with _locked(directory):
+        manifest = readManifest(directory)
+        merged = [s["name"] for s in old]
+        manifest["segments"] = [segment] + [s for s in manifest["segments"] if not s["name"] in merged]
+        manifest["obsolete"] += merged
+        _writeManifest(directory, manifest)
+
+if __name__ == "__main__":
+    if (len(sys.argv) < 3):
+        print("Too less arguments!")
+        print("Use: python3 {0} append store_dir in_file [in_file ...]".format(sys.argv[0]))
+        print("     python3 {0} compact store_dir".format(sys.argv[0]))
+        print("     python3 {0} export store_dir out_file".format(sys.argv[0]))
+        exit(1)
+
+    cmd = sys.argv[1]
+    directory = sys.argv[2]
+
+    if cmd == "append":
+        for f in sys.argv[3:]:
+            segment = append(directory, f)
+            print("{0}: {1} uplinks, f_cnt {2} to {3}".format(segment["name"], segment["count"], segment["first"], segment["last"]))
+    elif cmd == "compact":
+        compact(directory)
+    elif cmd == "export" and len(sys.argv) > 3:
+        print("{0} uplinks".format(ingest.writeUplinks(sys.argv[3], iterUplinks(directory))))
+    else:
+        print("Unknown command: {0}".format(cmd))
+        exit(1)
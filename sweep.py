@@ -0,0 +1,164 @@
+import sys
+import time
+import numpy as np
+
+import helper
+import experiments
+
+# Parameter sweeps
+# Loss, IPDs and watermarks of a measurement do not depend on nominal,
+# tolerance and phaseDelta, so prepare() computes them once. score() then
+# decodes the symbols for a whole grid of parameters at once: the parameters
+# get a grid axis, the messages the last axis, and the vectorized decoder of
+# helper.py broadcasts over both. Counts are the same as decoding every
+# point with helper.decodeColumns().
+
+# Size of the (grid points x messages) arrays decoded at once
+CHUNK_BYTES = 32 * 1024 * 1024
+
+def prepare(name, **settings):
+    # Everything of a measurement which does not depend on the swept
+    # parameters, settings overwrite the registry like in experiments.analyze()
+    import cache
+
+    e = experiments.get(name)
+    e.update(settings)
+
+    cols = cache.readColumnsFile(e["path"], e["gw_eui"])
+    res = helper.decodeColumns(cols, e["nominal"], e["tolerance"], e["phaseDelta"], e["bits"], e["watermarkShift"], e["gw_ts_name"], e["spreading"], e["spreadingSeed"], e["ecc"])
+
+    # Time the measurement took [s], for the goodput
+    # Always from the gateway time, the modem counter wraps
+    seconds = cols["gwSeconds"]
+    duration = 0
+    if np.any(~np.isnan(seconds)):
+        duration = np.nanmax(seconds) - np.nanmin(seconds)
+
+    prep = {
+        "e": e,
+        "msgIds": cols["loraMsgId"],
+        "tsDelta": res[e["gw_ts_name"] + "Delta"],
+        "valid": res["valid"],
+        "counted": res["counted"],
+        "calcEffWatermark": res["calcEffWatermark"],
+        "numMsgs": len(cols["loraMsgId"]),
+        "numMsgsLost": res["numMsgsLost"],
+        "numSymbolsPossible": res["numSymbolsPossible"],
+        "duration": duration,
+    }
+
+    if e["spreading"]:
+        prep["spreadingSequence"] = helper.getSpreadingParamArray(cols["loraMsgId"], e["spreadingSeed"], 0)[0]
+
+    return prep
+
+def _symbols(prep, nominal, tolerance, phaseDelta):
+    # Symbols of all messages for parameter columns (shape [points, 1]),
+    # same as in helper.decodeColumns()
+    e = prep["e"]
+    bits = e["bits"]
+    tsDelta = prep["tsDelta"]
+
+    if e["spreading"]:
+        # Same as helper.getSpreadingParamArray() with delayWindow_ms per point
+        delayWindow_ms = 2**bits * phaseDelta * 1000
+        spreadingDelay = (delayWindow_ms + ((prep["spreadingSequence"] * 2*delayWindow_ms) / 2**16)) / 1000
+        prevDelay = np.concatenate((np.full((len(nominal), 1), np.nan), spreadingDelay[:, :-1]), axis=1)
+        symbol = helper.extractSymbolArray_ss(tsDelta, nominal, phaseDelta, tolerance, bits, spreadingDelay, prevDelay)[0]
+    elif e["ecc"]:
+        symbol = helper.extractSymbolArray_ecc(tsDelta, nominal, phaseDelta, tolerance, bits)[1]
+    else:
+        symbol = helper.extractSymbolArray(tsDelta, nominal, phaseDelta, tolerance, bits)
+
+    return np.where(prep["valid"], symbol, -1)
+
+def _scoreChunk(prep, nominal, tolerance, phaseDelta):
+    # Returns [numSymbolErrors, numUndecodable] per point
+    symbol = _symbols(prep, nominal, tolerance, phaseDelta)
+    counted = prep["counted"]
+
+    if prep["e"]["bits"] == 1:
+        # DPSK, the symbol is the change against the previous message
+        effWatermark = np.full(symbol.shape, -1, np.int64)
+        both = counted[1:] & (symbol[:, :-1] >= 0) & (symbol[:, 1:] >= 0)
+        effWatermark[:, 1:] = np.where(both, symbol[:, :-1] ^ symbol[:, 1:], -1)
+    else:
+        effWatermark = symbol
+
+    decoded = counted & (effWatermark >= 0)
+    correct = decoded & (effWatermark == prep["calcEffWatermark"])
+
+    return [(counted & ~correct).sum(axis=1), (counted & ~decoded).sum(axis=1)]
+
+def score(prep, nominal, tolerance, phaseDelta):
+    # Decode with every combination of the (broadcast) parameter arrays
+    # Returns a dict of arrays in the broadcast shape:
+    #   numSymbolErrors, numUndecodable (no symbol found), ber [%],
+    #   bitsPerHour (correctly decoded watermark bits per hour)
+    # and the counts which are the same for every point:
+    #   numMsgs, numMsgsLost, numSymbolsPossible, packetLoss [%]
+    nominal, tolerance, phaseDelta = np.broadcast_arrays(np.asarray(nominal, float), np.asarray(tolerance, float), np.asarray(phaseDelta, float))
+    shape = nominal.shape
+    params = [p.reshape(-1, 1) for p in (nominal, tolerance, phaseDelta)]
+    numPoints = len(params[0])
+
+    errors = np.zeros(numPoints, np.int64)
+    undecodable = np.zeros(numPoints, np.int64)
+
+    # About ten arrays of (points x messages) are alive while decoding
+    step = max(1, CHUNK_BYTES // (10 * 8 * max(prep["numMsgs"], 1)))
+    for start in range(0, numPoints, step):
+        chunk = [p[start:start+step] for p in params]
+        errors[start:start+step], undecodable[start:start+step] = _scoreChunk(prep, *chunk)
+
+    possible = prep["numSymbolsPossible"]
+    result = {
+        "numSymbolErrors": errors.reshape(shape),
+        "numUndecodable": undecodable.reshape(shape),
+        "ber": np.full(shape, np.nan),
+        "bitsPerHour": np.full(shape, np.nan),
+        "numMsgs": prep["numMsgs"],
+        "numMsgsLost": prep["numMsgsLost"],
+        "numSymbolsPossible": possible,
+        "packetLoss": None,
+    }
+
+    if possible > 0:
+        result["ber"] = (result["numSymbolErrors"] / possible) * 100
+    if prep["duration"] > 0:
+        result["bitsPerHour"] = (possible - result["numSymbolErrors"]) * prep["e"]["bits"] / (prep["duration"] / 3600)
+    if prep["numMsgs"] > 0:
+        result["packetLoss"] = (prep["numMsgsLost"] / prep["numMsgs"]) * 100
+
+    return result
+
+def grid(prep, nominals, tolerances, phaseDeltas):
+    # score() of every combination, result arrays have the axes
+    # [nominal, tolerance, phaseDelta]
+    n, t, p = np.meshgrid(nominals, tolerances, phaseDeltas, indexing="ij")
+    return score(prep, n, t, p)
+
+if __name__ == "__main__":
+    if (len(sys.argv) < 2):
+        print("Too less arguments!")
+        print("Use: python3 {0} measurement [measurement ...]".format(sys.argv[0]))
+        print("Sweeps nominal +-100 ms and tolerance up to phaseDelta/2 around the settings in experiments.py")
+        exit(1)
+
+    for name in sys.argv[1:]:
+        prep = prepare(name.strip("/"))
+        e = prep["e"]
+
+        nominals = e["nominal"] + np.arange(-0.1, 0.1001, 0.001)
+        tolerances = np.linspace(0.001, e["phaseDelta"] / 2, 50)
+        phaseDeltas = [e["phaseDelta"]]
+
+        start = time.time()
+        res = grid(prep, nominals, tolerances, phaseDeltas)
+        duration = time.time() - start
+
+        print("{0}: {1} points in {2:.2f} s ({3:.0f} points/s), {4} symbols possible".format(e["name"], res["numSymbolErrors"].size, duration, res["numSymbolErrors"].size / duration, res["numSymbolsPossible"]))
+        order = np.argsort(res["numSymbolErrors"], axis=None, kind="stable")[:5]
+        for i in order:
+            n, t, p = np.unravel_index(i, res["numSymbolErrors"].shape)
+            print("\tnominal: {0:.3f} s, tolerance: {1:.4f} s, phaseDelta: {2:.3f} s: {3} errors, {4} undecodable, BER {5:.2f} %".format(nominals[n], tolerances[t], phaseDeltas[p], res["numSymbolErrors"][n, t, p], res["numUndecodable"][n, t, p], res["ber"][n, t, p]))
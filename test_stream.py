@@ -0,0 +1,42 @@
+import copy
+import numpy as np
+
+import helper
+import ingest
+import experiments
+
+def _decode(uplinks, **settings):
+    # Batch and streaming decode of the same uplinks
+    batch = helper.readMessagesBatch(uplinks, printMatches=False, **settings)
+    d = helper.StreamingDecoder(**settings)
+    events = [event for event in (d.push(u) for u in uplinks) if event != None]
+    return [batch, events, d.result()]
+
+def test_missing_timestamp():
+    # rx_metadata without "timestamp" is decoded like readGateways() does
+    e = experiments.get("mea_25_xor_4bit")
+    uplinks = list(ingest.iterUplinks(e["path"]))[:200]
+    uplinks = copy.deepcopy(uplinks)
+    for rx in uplinks[100]["result"]["uplink_message"]["rx_metadata"]:
+        del rx["timestamp"]
+
+    for gw_ts_name in ("gwTs", "modemTs"):
+        settings = dict(nominal=e["nominal"], tolerance=e["tolerance"], phaseDelta=e["phaseDelta"], bits=e["bits"], gw_eui=e["gw_eui"], gw_ts_name=gw_ts_name)
+        batch, events, counters = _decode(uplinks, **settings)
+
+        msgs = batch["msgs"]
+        assert len(events) == len(msgs)
+        for key in ("numMsgsLost", "numSymbolsPossible", "numSymbolErrors"):
+            assert counters[key] == batch[key]
+
+        deltas = msgs.column(gw_ts_name + ".delta")
+        symbols = msgs.column("extraction.symbol")
+        for i, event in enumerate(events):
+            if event["delta"] == None:
+                assert np.isnan(deltas[i])
+            else:
+                assert event["delta"] == deltas[i]
+            assert (-1 if event["symbol"] == None else event["symbol"]) == symbols[i]
+
+    # The modem counter is unknown around the uplink without timestamp
+    assert np.isnan(deltas[100]) and np.isnan(deltas[101])
@@ -0,0 +1,22 @@
+import numpy as np
+
+import helper
+import cache
+import experiments
+import sweep
+
+def test_modemTs_sweep():
+    # Sweeping with the modem counter as time source, the counts are the
+    # same as decoding every point with helper.decodeColumns()
+    name = "mea_25_xor_4bit"
+    prep = sweep.prepare(name, gw_ts_name="modemTs")
+    e = prep["e"]
+    assert prep["duration"] > 0
+
+    nominals = e["nominal"] + np.array([-0.01, 0, 0.01])
+    res = sweep.grid(prep, nominals, [e["tolerance"]], [e["phaseDelta"]])
+
+    cols = cache.readColumnsFile(e["path"], e["gw_eui"])
+    for i, nominal in enumerate(nominals):
+        ref = helper.decodeColumns(cols, nominal, e["tolerance"], e["phaseDelta"], e["bits"], e["watermarkShift"], "modemTs", e["spreading"], e["spreadingSeed"], e["ecc"])
+        assert res["numSymbolErrors"][i, 0, 0] == ref["numSymbolErrors"]
@@ -1,4 +1,14 @@
+import io
+import os
 import json
+import inspect
+import hashlib
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import matplotlib
+# Figures are only written to files, the same backend is used whether they
+# are rendered in this process or in workers, with or without a display
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
 from matplotlib import colors
@@ -16,34 +26,20 @@ HEIGHT = HEIGHT_cm * 1/2.54
 
 #import helper
 
-import mea_11_jitter.analyze
-import mea_12_xor_dpsk_10s.analyze
-import mea_13_xor_dpsk_20ms.analyze
-import mea_14_xor_dpsk_30ms.analyze
-import mea_15_xor_dpsk_40ms.analyze
-import mea_16_xor_dpsk_50ms.analyze
-import mea_17_xor_dpsk_60ms.analyze
-import mea_18_xor_dpsk_70ms.analyze
-import mea_19_xor_dpsk_100ms.analyze
-import mea_20_xor_dpsk_nojumpback_100ms.analyze
-import mea_21_xor_dpsk_nojumpback_50ms.analyze
-import mea_22_xor_8bit.analyze
-import mea_24_xor_2bit.analyze
-import mea_25_xor_4bit.analyze
-import mea_27_xor_4bit_lfsr_fix.analyze
-import mea_28_xor_4bit_lfsr_ss.analyze
-import mea_29_xor_4bit_hamming_50ms.analyze
-import mea_30_xor_4bit_feld.analyze
-import mea_31_xor_4bit_hochstand.analyze
+import experiments
+import histogram
+import downsample
+import codec
 import analyze
+import runner
 
 # Ignore NONE in list
 import warnings
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
-def plot_single_hist(data, bins, filename, color='b', xlabel='ms', ylabel='frequency', show=False):
+def plot_single_hist(h, filename, color='b', xlabel='ms', ylabel='frequency', show=False):
     fig, ax = plt.subplots(figsize=(WIDTH, HEIGHT))
-    ax.hist(data, bins=bins, color=color)
+    histogram.draw(ax, h, color=color)
     ax.set_xlabel(xlabel)
     ax.set_ylabel(ylabel)
 
@@ -57,9 +53,11 @@ def plot_single_hist(data, bins, filename, color='b', xlabel='ms', ylabel='frequ
     plt.close()
 
 
-def plot_single_hist_with_norm(data, mu, sigma, bins, filename, color='b', xlabel='ms', ylabel='density', show=False):
+def plot_single_hist_with_norm(h, mu, sigma, filename, color='b', xlabel='ms', ylabel='density', show=False):
+    # h with density=True, see histogram.py
     fig, ax = plt.subplots(figsize=(WIDTH, HEIGHT))
-    count, bins, ignored = ax.hist(data, bins=bins, color=color, density=True)
+    histogram.draw(ax, h, color=color)
+    bins = h["edges"]
 
     plt.plot(bins, 1/(sigma * np.sqrt(2 * np.pi)) * np.exp( - (bins - mu)**2 / (2 * sigma**2) ), color='r')
 
@@ -75,9 +73,9 @@ def plot_single_hist_with_norm(data, mu, sigma, bins, filename, color='b', xlabe
     plt.cla()
     plt.close()
 
-def plot_single_ipd(data, filename, color='b.-', xlabel='msg', ylabel='IPD at gateway [s]', show=False):
+def plot_single_ipd(data, filename, color='b.-', xlabel='msg', ylabel='IPD at gateway [s]', points=downsample.TARGET_POINTS, show=False):
     fig, ax = plt.subplots(figsize=(WIDTH, HEIGHT))
-    ax.plot(data[0], data[1], color)
+    downsample.plot(ax, data[0], data[1], color, target=points)
     ax.set_xlabel(xlabel)
     ax.set_ylabel(ylabel)
     ax.tick_params('y')
@@ -96,13 +94,13 @@ def plot_temp_vdd(msgs, temp, vdd, msgs_received, filename, xlabel='msg', legend
     fig, (ax0, ax1) = plt.subplots(2, 1, sharex=True, figsize=(WIDTH, HEIGHT), gridspec_kw=dict(height_ratios=[15, 1]))
 
     # temp
-    line_temp = ax0.plot(msgs, temp, color = "b", label='Temperature')
+    line_temp = downsample.plot(ax0, msgs, temp, color = "b", label='Temperature')
     ax0.set_ylabel("[°C]")
     ax0.tick_params('y', colors='b')
 
     ax002 = ax0.twinx()
 
-    line_vdd = ax002.plot(msgs, vdd, color = "r", marker = "v", markevery=0.2, label='Vdd')
+    line_vdd = downsample.plot(ax002, msgs, vdd, color = "r", marker = "v", markevery=0.2, label='Vdd')
     ax002.set_ylabel('[V]')
     ax002.tick_params('y', colors='r')
 
@@ -135,27 +133,11 @@ def plot_temp_vdd(msgs, temp, vdd, msgs_received, filename, xlabel='msg', legend
     plt.close()
 
 
-def plot():
-    mea_11 = mea_11_jitter.analyze.analyze(mea_11_jitter.analyze.readMeasurements("mea_11_jitter/out.json"))
-    mea_12 = mea_12_xor_dpsk_10s.analyze.analyze(mea_12_xor_dpsk_10s.analyze.readMeasurements("mea_12_xor_dpsk_10s/out.json"))
-    mea_13 = mea_13_xor_dpsk_20ms.analyze.analyze(mea_13_xor_dpsk_20ms.analyze.readMeasurements("mea_13_xor_dpsk_20ms/out.json"))
-    mea_14 = mea_14_xor_dpsk_30ms.analyze.analyze(mea_14_xor_dpsk_30ms.analyze.readMeasurements("mea_14_xor_dpsk_30ms/out.json"))
-    mea_15 = mea_15_xor_dpsk_40ms.analyze.analyze(mea_15_xor_dpsk_40ms.analyze.readMeasurements("mea_15_xor_dpsk_40ms/out.json"))
-    mea_16 = mea_16_xor_dpsk_50ms.analyze.analyze(mea_16_xor_dpsk_50ms.analyze.readMeasurements("mea_16_xor_dpsk_50ms/out.json"))
-    mea_17 = mea_17_xor_dpsk_60ms.analyze.analyze(mea_17_xor_dpsk_60ms.analyze.readMeasurements("mea_17_xor_dpsk_60ms/out.json"))
-    mea_18 = mea_18_xor_dpsk_70ms.analyze.analyze(mea_18_xor_dpsk_70ms.analyze.readMeasurements("mea_18_xor_dpsk_70ms/out.json"))
-    mea_19 = mea_19_xor_dpsk_100ms.analyze.analyze(mea_19_xor_dpsk_100ms.analyze.readMeasurements("mea_19_xor_dpsk_100ms/out.json"))
-    mea_20 = mea_20_xor_dpsk_nojumpback_100ms.analyze.analyze(mea_20_xor_dpsk_nojumpback_100ms.analyze.readMeasurements("mea_20_xor_dpsk_nojumpback_100ms/nojump_100ms.json"))
-    mea_21 = mea_21_xor_dpsk_nojumpback_50ms.analyze.analyze(mea_21_xor_dpsk_nojumpback_50ms.analyze.readMeasurements("mea_21_xor_dpsk_nojumpback_50ms/nojump_50ms.json"))
-    mea_22 = mea_22_xor_8bit.analyze.analyze(mea_22_xor_8bit.analyze.readMeasurements("mea_22_xor_8bit/8bit.json"))
-    mea_24 = mea_24_xor_2bit.analyze.analyze(mea_24_xor_2bit.analyze.readMeasurements("mea_24_xor_2bit/2bit.json"))
-    mea_25 = mea_25_xor_4bit.analyze.analyze(mea_25_xor_4bit.analyze.readMeasurements("mea_25_xor_4bit/4bit.json"))
-    mea_27 = mea_27_xor_4bit_lfsr_fix.analyze.analyze(mea_27_xor_4bit_lfsr_fix.analyze.readMeasurements("mea_27_xor_4bit_lfsr_fix/4bit_lfsr.json"))
-    mea_28 = mea_28_xor_4bit_lfsr_ss.analyze.analyze(mea_28_xor_4bit_lfsr_ss.analyze.readMeasurements("mea_28_xor_4bit_lfsr_ss/4bit_ss.json"))
-    mea_29 = mea_29_xor_4bit_hamming_50ms.analyze.analyze(mea_29_xor_4bit_hamming_50ms.analyze.readMeasurements("mea_29_xor_4bit_hamming_50ms/ecc_50ms.json"))
-    mea_30 = mea_30_xor_4bit_feld.analyze.analyze(mea_30_xor_4bit_feld.analyze.readMeasurements("mea_30_xor_4bit_feld/feld.json"))
-
-    packetloss = analyze.getPacketLosses()
+# Every figure is a function (filename)
+# Histograms are read with experiments.deltaHistogram(), the decoded messages
+# are only read by figures which draw single messages
+
+def plot_phase_errors(filename):
     ber = analyze.getBER()
 
     # Print barchart of BER
@@ -165,174 +147,154 @@ def plot():
 #    plt.title("Phases wrongly decoded")
     plt.ylabel("[%]")
     plt.grid(linestyle='--', axis='y')
-    plt.savefig("phase_errors.svg")
+    plt.savefig(filename)
 #    plt.show()
     plt.clf()
     plt.cla()
     plt.close()
 
+def plot_hist_jitter_pdf(filename):
     # Print PDF of jitter
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_11["msgs"]), float)
-    y2 = ((y2) - mea_11_jitter.analyze.NOMINAL_S) * 1000
-    y2 = y2[2:] # Delete first, this is an outlier
+    h = experiments.deltaHistogram("mea_11_jitter", start=2, density=True)
 
     plot_single_hist_with_norm(
-        data=y2,
+        h=h,
         mu=-4.4027,
         sigma=8.58411,
-        bins=mea_11_jitter.analyze.HIST_BINS,
-        filename="hist_jitter_pdf.svg"
+        filename=filename
     )
 
+def plot_delta_10s(filename):
     # Print delta of 10s
-    ipd = [list(ele["loraMsgId"] for ele in mea_12["msgs"]), list(ele["gwTs"]["delta"] for ele in mea_12["msgs"])]
+    mea_12 = experiments.analyze("mea_12_xor_dpsk_10s")
+    ipd = [mea_12["msgs"].column("loraMsgId"), mea_12["msgs"].column("gwTs.delta")]
     plot_single_ipd(
         data = ipd,
-        filename = "delta_10s.svg"
+        filename = filename
     )
 
+def plot_hist_10s(filename):
     # Print hist of 10s
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_12["msgs"]), float)
-    y2 = ((y2) - mea_12_xor_dpsk_10s.analyze.NOMINAL_S) * 1000
-    y2 = y2[y2 > -1000]
+    h = experiments.deltaHistogram("mea_12_xor_dpsk_10s", low=-1000)
 
     plot_single_hist(
-        data=y2,
-        bins=mea_12_xor_dpsk_10s.analyze.HIST_BINS,
-        filename="hist_10s.svg"
+        h=h,
+        filename=filename
     )
 
+def plot_delta_100ms(filename):
     # Print delta of 100ms
-
-    ipd = [list(ele["loraMsgId"] for ele in mea_19["msgs"]), list(ele["gwTs"]["delta"] for ele in mea_19["msgs"])]
+    mea_19 = experiments.analyze("mea_19_xor_dpsk_100ms")
+    ipd = [mea_19["msgs"].column("loraMsgId"), mea_19["msgs"].column("gwTs.delta")]
     plot_single_ipd(
         data = ipd,
-        filename = "delta_100ms.svg"
+        filename = filename
     )
 
+def plot_hist_100ms(filename):
     # Print hist of 100ms
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_19["msgs"]), float)
-    y2 = ((y2) - mea_19_xor_dpsk_100ms.analyze.NOMINAL_S) * 1000
-    y2 = y2[y2 > -200]
+    h = experiments.deltaHistogram("mea_19_xor_dpsk_100ms", low=-200)
 
     plot_single_hist(
-        data=y2,
-        bins=mea_19_xor_dpsk_100ms.analyze.HIST_BINS,
-        filename="hist_100ms.svg"
+        h=h,
+        filename=filename
     )
 
+def plot_hist(filename):
     # Print hist of all
 #    fig, axs = plt.subplots(2, 4, figsize=(10,5))
     fig, axs = plt.subplots(4, 2, figsize=(10,7))
     fig.tight_layout(h_pad=2)
 
     # 20ms
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_13["msgs"]), float)
-    y2 = ((y2) - mea_13_xor_dpsk_20ms.analyze.NOMINAL_S) * 1000
-    axs[0][0].hist(y2, bins=mea_13_xor_dpsk_20ms.analyze.HIST_BINS, color='b')
+    histogram.draw(axs[0][0], experiments.deltaHistogram("mea_13_xor_dpsk_20ms"), color='b')
     axs[0][0].set_title("a) 20 ms")
     axs[0][0].set_ylabel("frequency")
 #    axs[0][0].set_xlabel("ms", fontsize=8)
 
     # 30ms
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_14["msgs"]), float)
-    y2 = ((y2) - mea_14_xor_dpsk_30ms.analyze.NOMINAL_S) * 1000
-    axs[0][1].hist(y2, bins=mea_14_xor_dpsk_30ms.analyze.HIST_BINS, color='b')
+    histogram.draw(axs[0][1], experiments.deltaHistogram("mea_14_xor_dpsk_30ms"), color='b')
     axs[0][1].set_title("b) 30 ms")
 #    axs[0][1].set_xlabel("ms", fontsize=8)
 
     # 40ms
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_15["msgs"]), float)
-    y2 = ((y2) - mea_15_xor_dpsk_40ms.analyze.NOMINAL_S) * 1000
-    axs[1][0].hist(y2, bins=mea_15_xor_dpsk_40ms.analyze.HIST_BINS, color='b')
+    histogram.draw(axs[1][0], experiments.deltaHistogram("mea_15_xor_dpsk_40ms"), color='b')
     axs[1][0].set_title("c) 40 ms")
 #    axs[1][0].set_xlabel("ms", fontsize=8)
 
     # 50ms
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_16["msgs"]), float)
-    y2 = ((y2) - mea_16_xor_dpsk_50ms.analyze.NOMINAL_S) * 1000
-    axs[1][1].hist(y2, bins=mea_16_xor_dpsk_50ms.analyze.HIST_BINS, color='b')
+    histogram.draw(axs[1][1], experiments.deltaHistogram("mea_16_xor_dpsk_50ms"), color='b')
     axs[1][1].set_title("d) 50 ms")
 #    axs[1][2].set_xlabel("ms", fontsize=8)
 
     # 60ms
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_17["msgs"]), float)
-    y2 = ((y2) - mea_17_xor_dpsk_60ms.analyze.NOMINAL_S) * 1000
-    axs[2][0].hist(y2, bins=mea_17_xor_dpsk_60ms.analyze.HIST_BINS, color='b')
+    histogram.draw(axs[2][0], experiments.deltaHistogram("mea_17_xor_dpsk_60ms"), color='b')
     axs[2][0].set_title("e) 60 ms")
 #    axs[2][0].set_xlabel("ms", fontsize=8)
 
     # 70ms
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_18["msgs"]), float)
-    y2 = ((y2) - mea_18_xor_dpsk_70ms.analyze.NOMINAL_S) * 1000
-    axs[2][1].hist(y2, bins=mea_18_xor_dpsk_70ms.analyze.HIST_BINS, color='b')
+    histogram.draw(axs[2][1], experiments.deltaHistogram("mea_18_xor_dpsk_70ms"), color='b')
     axs[2][1].set_title("f) 70 ms")
 #    axs[2][1].set_xlabel("ms", fontsize=8)
 
     # 100ms
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_19["msgs"]), float)
-    y2 = ((y2) - mea_19_xor_dpsk_100ms.analyze.NOMINAL_S) * 1000
-    axs[3][0].hist(y2, bins=mea_19_xor_dpsk_100ms.analyze.HIST_BINS, color='b')
+    histogram.draw(axs[3][0], experiments.deltaHistogram("mea_19_xor_dpsk_100ms"), color='b')
     axs[3][0].set_title("g) 100 ms")
     axs[3][0].set_xlabel("ms", fontsize=8)
 
     # 10 s
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_12["msgs"]), float)
-    y2 = ((y2) - mea_12_xor_dpsk_10s.analyze.NOMINAL_S) * 1000
-    axs[3][1].hist(y2, bins=mea_12_xor_dpsk_10s.analyze.HIST_BINS, color='b')
+    histogram.draw(axs[3][1], experiments.deltaHistogram("mea_12_xor_dpsk_10s"), color='b')
     axs[3][1].set_title("h) 10 s")
     axs[3][1].set_xlabel("ms", fontsize=8)
-    plt.savefig("hist.svg")
+    plt.savefig(filename)
 #    plt.show()
     plt.clf()
     plt.cla()
     plt.close()
 
+def plot_delta_100ms_nojumpback(filename):
     # nojumpback measurements plots
     # 100ms delta
-
-
-    ipd = [list(ele["loraMsgId"] for ele in mea_20["msgs"])[:121], list(ele["gwTs"]["delta"] for ele in mea_20["msgs"])[:121]]
+    mea_20 = experiments.analyze("mea_20_xor_dpsk_nojumpback_100ms")
+    ipd = [mea_20["msgs"].column("loraMsgId")[:121], mea_20["msgs"].column("gwTs.delta")[:121]]
     plot_single_ipd(
         data = ipd,
-        filename = "delta_100ms_nojumpback.svg",
+        filename = filename,
     )
 
+def plot_hist_nojumpback(filename):
     # 50ms + 100ms hist
     fig, axs = plt.subplots(1, 2, figsize=(7,3))
     fig.tight_layout(h_pad=2)
 
     # 50ms
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_21["msgs"]), float)
-    y2 = ((y2) - mea_21_xor_dpsk_nojumpback_50ms.analyze.NOMINAL_S) * 1000
-    axs[0].hist(y2, bins=mea_21_xor_dpsk_nojumpback_50ms.analyze.HIST_BINS, color='b')
+    histogram.draw(axs[0], experiments.deltaHistogram("mea_21_xor_dpsk_nojumpback_50ms"), color='b')
     axs[0].set_title("a) 50 ms")
     axs[0].set_xlabel("ms", fontsize=8)
     axs[0].set_ylabel("frequency", fontsize=8)
 
 
     # 100ms
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_20["msgs"]), float)
-    y2 = ((y2) - mea_20_xor_dpsk_nojumpback_100ms.analyze.NOMINAL_S) * 1000
-    axs[1].hist(y2, bins=mea_20_xor_dpsk_nojumpback_100ms.analyze.HIST_BINS, color='b')
+    histogram.draw(axs[1], experiments.deltaHistogram("mea_20_xor_dpsk_nojumpback_100ms"), color='b')
     axs[1].set_title("b) 100 ms")
     axs[1].set_xlabel("ms", fontsize=8)
-    plt.savefig("hist_nojumpback.svg")
+    plt.savefig(filename)
 #    plt.show()
     plt.clf()
     plt.cla()
     plt.close()
 
+def plot_delta_2bit(filename):
     # nbit plots
     # plot deltas of 2 bit encoding
-
-
-    ipd = [list(ele["loraMsgId"] for ele in mea_24["msgs"])[900:1100], list(ele["gwTs"]["delta"] for ele in mea_24["msgs"])[900:1100]]
+    mea_24 = experiments.analyze("mea_24_xor_2bit")
+    ipd = [mea_24["msgs"].column("loraMsgId")[900:1100], mea_24["msgs"].column("gwTs.delta")[900:1100]]
     plot_single_ipd(
         data = ipd,
-        filename = "delta_2bit.svg",
+        filename = filename,
     )
 
+def plot_hist_nbit(filename):
     # plot hist of all nbits
 #    fig, axs = plt.subplots(2, 2, figsize=(7,3))
     fig = plt.figure()
@@ -343,174 +305,275 @@ def plot():
     ax3 = fig.add_subplot(gs[1,:])
 
     # 2bit
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_24["msgs"]), float)
-    y2 = ((y2) - mea_24_xor_2bit.analyze.NOMINAL_S) * 1000
-    ax1.hist(y2, bins=mea_24_xor_2bit.analyze.HIST_BINS, color='b')
+    histogram.draw(ax1, experiments.deltaHistogram("mea_24_xor_2bit"), color='b')
     ax1.set_title("a) 2 bit")
     ax1.set_ylabel("frequency")
 
     # 4bit
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_25["msgs"]), float)
-    y2 = ((y2) - mea_25_xor_4bit.analyze.NOMINAL_S) * 1000
-    ax2.hist(y2, bins=mea_25_xor_4bit.analyze.HIST_BINS, color='b')
+    histogram.draw(ax2, experiments.deltaHistogram("mea_25_xor_4bit"), color='b')
     ax2.set_title("b) 4 bit")
 
     # 8bit
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_22["msgs"]), float)
-    y2 = ((y2) - mea_22_xor_8bit.analyze.NOMINAL_S) * 1000
-    ax3.hist(y2, bins=mea_22_xor_8bit.analyze.HIST_BINS, color='b')
+    histogram.draw(ax3, experiments.deltaHistogram("mea_22_xor_8bit"), color='b')
     ax3.set_title("c) 8 bit")
     ax3.set_xlabel("ms", fontsize=8)
 
-    plt.savefig("hist_nbit.svg")
+    plt.savefig(filename)
 #    plt.show()
     plt.clf()
     plt.cla()
     plt.close()
 
-
+def plot_hist_4bit_lfsr(filename):
     # 4bit with lfsr
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_27["msgs"]), float)
-    y2 = ((y2) - mea_27_xor_4bit_lfsr_fix.analyze.NOMINAL_S) * 1000
+    h = experiments.deltaHistogram("mea_27_xor_4bit_lfsr_fix")
 
     plot_single_hist(
-        data=y2,
-        bins=mea_27_xor_4bit_lfsr_fix.analyze.HIST_BINS,
-        filename="hist_4bit_lfsr.svg"
+        h=h,
+        filename=filename
     )
 
+def plot_hist_4bit_ss(filename):
     # 4bit with lfsr and spreading
     # Show histogram
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_28["msgs"]), float)
-    y2 = ((y2) - mea_28_xor_4bit_lfsr_ss.analyze.NOMINAL_S) * 1000
+    h = experiments.deltaHistogram("mea_28_xor_4bit_lfsr_ss")
 
     plot_single_hist(
-        data=y2,
-        bins=mea_28_xor_4bit_lfsr_ss.analyze.HIST_BINS,
-        filename="hist_4bit_ss.svg"
+        h=h,
+        filename=filename
     )
 
+def plot_hist_4bit_ss_despread(filename):
     # Show despreaded histogram
-    y2 = np.array(list(ele["gwTs"]["despreaded"] for ele in mea_28["msgs"]), float)
-    y2 = ((y2) - mea_28_xor_4bit_lfsr_ss.analyze.NOMINAL_S) * 1000
+    h = experiments.deltaHistogram("mea_28_xor_4bit_lfsr_ss", "gwTs.despreaded")
 
     plot_single_hist(
-        data=y2,
-        bins=mea_28_xor_4bit_lfsr_ss.analyze.HIST_BINS,
-        filename="hist_4bit_ss_despread.svg"
+        h=h,
+        filename=filename
     )
 
+def plot_hist_4bit_ecc(filename):
     # Show ecc histogram
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_29["msgs"]), float)
-    y2 = ((y2) - mea_29_xor_4bit_hamming_50ms.analyze.NOMINAL_S) * 1000
+    h = experiments.deltaHistogram("mea_29_xor_4bit_hamming_50ms")
 
     plot_single_hist(
-        data=y2,
-        bins=mea_29_xor_4bit_hamming_50ms.analyze.HIST_BINS,
-        filename="hist_4bit_ecc.svg"
+        h=h,
+        filename=filename
     )
 
+def plot_feld_temp(filename):
     # Feld temperature/vdd plot
-    for msg in mea_30["msgs"]:
-        msg["vdd_V"] = ((msg["payload"]["raw"] >> 16) & 0xffff)/1000
-        msg["temp_C"] = ((msg["payload"]["raw"] & 0xffff) / 2**6 ) - 273.15
-
-    max_msgs = int(mea_30["msgs"][-1]["loraMsgId"])
-    msg_received = np.zeros((1, max_msgs+1), bool)
+    mea_30 = experiments.analyze("mea_30_xor_4bit_feld")
+    fields = experiments.payloadFields(experiments.get("mea_30_xor_4bit_feld"), mea_30["msgs"])
 
-    for msg in mea_30["msgs"]:
-        msg_received[0, int(msg["loraMsgId"])] = True
+    msg_ids = mea_30["msgs"].column("loraMsgId")
+    msg_received = np.zeros((1, msg_ids[-1]+1), bool)
+    msg_received[0, msg_ids] = True
 
     plot_temp_vdd(
-        list(ele["loraMsgId"] for ele in mea_30["msgs"]),
-        np.array(list(ele["temp_C"] for ele in mea_30["msgs"]), float),
-        np.array(list(ele["vdd_V"] for ele in mea_30["msgs"]), float),
+        msg_ids,
+        fields["temp_C"],
+        fields["vdd_V"],
         msg_received,
-        filename = "feld_temp.svg",
+        filename = filename,
         legend_loc='lower left',
         show = False
     )
 
+def plot_feld_hist(filename):
     # Feld histogram
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_30["msgs"]), float)
-    y2 = ((y2) - mea_30_xor_4bit_feld.analyze.NOMINAL_S) * 1000
+    h = experiments.deltaHistogram("mea_30_xor_4bit_feld")
 
     plot_single_hist(
-        data=y2,
-        bins=mea_30_xor_4bit_feld.analyze.HIST_BINS,
-        filename="feld_hist.svg"
+        h=h,
+        filename=filename
     )
 
-    mea_31 = mea_31_xor_4bit_hochstand.analyze.analyze(mea_31_xor_4bit_hochstand.analyze.readMeasurements("mea_31_xor_4bit_hochstand/hochstand.json"), gw_eui="58A0CBFFFE802A21", gw_ts_name="gwTs")
-
+def plot_hochstand_temp(filename):
     # Hochstand temperature/vdd plot
-    for msg in mea_31["msgs"]:
-        msg["vdd_V"] = ((msg["payload"]["raw"] >> 16) & 0xffff)/1000
-        msg["temp_C"] = ((msg["payload"]["raw"] & 0xffff) / 2**6 ) - 273.15
+    mea_31 = experiments.analyze("mea_31_xor_4bit_hochstand")
+    fields = experiments.payloadFields(experiments.get("mea_31_xor_4bit_hochstand"), mea_31["msgs"])
 
-    max_msgs = int(mea_31["msgs"][-1]["loraMsgId"])
-    msg_received = np.zeros((1, max_msgs+1), bool)
-
-    for msg in mea_31["msgs"]:
-        msg_received[0, int(msg["loraMsgId"])] = True
+    msg_ids = mea_31["msgs"].column("loraMsgId")
+    msg_received = np.zeros((1, msg_ids[-1]+1), bool)
+    msg_received[0, msg_ids] = True
 
     plot_temp_vdd(
-        list(ele["loraMsgId"] for ele in mea_31["msgs"]),
-        np.array(list(ele["temp_C"] for ele in mea_31["msgs"]), float),
-        np.array(list(ele["vdd_V"] for ele in mea_31["msgs"]), float),
+        msg_ids,
+        fields["temp_C"],
+        fields["vdd_V"],
         msg_received,
-        filename = "hochstand_temp.svg",
+        filename = filename,
         legend_loc='lower left',
         show = False
     )
 
+def plot_hochstand_hist(filename):
     # Hochstand histogram
-    y2 = np.array(list(ele["gwTs"]["delta"] for ele in mea_31["msgs"]), float)
-    y2 = ((y2) - mea_31_xor_4bit_hochstand.analyze.NOMINAL_S) * 1000
+    h = experiments.deltaHistogram("mea_31_xor_4bit_hochstand")
 
     plot_single_hist(
-        data=y2,
-        bins=mea_31_xor_4bit_hochstand.analyze.HIST_BINS,
-        filename="hochstand_hist.svg"
+        h=h,
+        filename=filename
     )
 
-#    mea_31 = mea_31_xor_4bit_hochstand.analyze.analyze(mea_31_xor_4bit_hochstand.analyze.readMeasurements("mea_31_xor_4bit_hochstand/hochstand.json"), gw_eui="58A0CBFFFE802A21", gw_ts_name="time")
-
+def plot_usts_jitter_abs(filename):
     # Jitter with us_timestamp
-    ipd = [list(ele["loraMsgId"] for ele in mea_11["msgs"])[239:298], list(ele["modemTs"]["seconds"] for ele in mea_11["msgs"])[239:298]]
+    mea_11 = experiments.analyze("mea_11_jitter")
+    ipd = [mea_11["msgs"].column("loraMsgId")[239:298], mea_11["msgs"].column("modemTs.seconds")[239:298]]
 
     plot_single_ipd(
         data = ipd,
-        filename = "usts_jitter_abs.svg",
+        filename = filename,
         ylabel="µs timestamp [s]"
     )
 
-    ipd = [list(ele["loraMsgId"] for ele in mea_11["msgs"]), list(ele["modemTs"]["delta"] for ele in mea_11["msgs"])]
+def plot_usts_jitter_ipd(filename):
+    mea_11 = experiments.analyze("mea_11_jitter")
+    ipd = [mea_11["msgs"].column("loraMsgId"), mea_11["msgs"].column("modemTs.delta")]
     plot_single_ipd(
         data = ipd,
-        filename = "usts_jitter_ipd.svg"
+        filename = filename
     )
 
-    y2 = np.array(list(ele["modemTs"]["delta"] for ele in mea_11["msgs"]), float)
-    y2 = y2[y2>299] # Delete first, this is an outlier
-    y2 = ((y2) - mea_11_jitter.analyze.NOMINAL_S) * 1000
+def plot_usts_jitter_hist(filename):
+    h = experiments.deltaHistogram("mea_11_jitter", "modemTs.delta", low=-1000)
 
     plot_single_hist(
-        data=y2,
-        bins=mea_11_jitter.analyze.HIST_BINS,
-        filename="usts_jitter_hist.svg"
+        h=h,
+        filename=filename
     )
 
-    y2 = np.array(list(ele["modemTs"]["delta"] for ele in mea_13["msgs"]), float)
-    y2 = ((y2) - mea_13_xor_dpsk_20ms.analyze.NOMINAL_S) * 1000
-    y2 = y2[y2>-500]
+def plot_usts_20ms_hist(filename):
+    h = experiments.deltaHistogram("mea_13_xor_dpsk_20ms", "modemTs.delta", low=-500)
 
     plot_single_hist(
-        data=y2,
-        bins=mea_13_xor_dpsk_20ms.analyze.HIST_BINS,
-        filename="usts_20ms_hist.svg"
+        h=h,
+        filename=filename
     )
 
+# Figure build graph
+# filename: [function, measurements it reads, other code it depends on]
+# A figure is only rendered again if one of its dependencies changed, see
+# stamp(). The plot_single_*() helpers are a dependency of every figure.
+FIGURES = {
+    "phase_errors.svg": [plot_phase_errors, analyze.DPSK_MEASUREMENTS, [analyze.getBER]],
+    "hist_jitter_pdf.svg": [plot_hist_jitter_pdf, ["mea_11_jitter"], []],
+    "delta_10s.svg": [plot_delta_10s, ["mea_12_xor_dpsk_10s"], []],
+    "hist_10s.svg": [plot_hist_10s, ["mea_12_xor_dpsk_10s"], []],
+    "delta_100ms.svg": [plot_delta_100ms, ["mea_19_xor_dpsk_100ms"], []],
+    "hist_100ms.svg": [plot_hist_100ms, ["mea_19_xor_dpsk_100ms"], []],
+    "hist.svg": [plot_hist, ["mea_13_xor_dpsk_20ms", "mea_14_xor_dpsk_30ms", "mea_15_xor_dpsk_40ms", "mea_16_xor_dpsk_50ms", "mea_17_xor_dpsk_60ms", "mea_18_xor_dpsk_70ms", "mea_19_xor_dpsk_100ms", "mea_12_xor_dpsk_10s"], []],
+    "delta_100ms_nojumpback.svg": [plot_delta_100ms_nojumpback, ["mea_20_xor_dpsk_nojumpback_100ms"], []],
+    "hist_nojumpback.svg": [plot_hist_nojumpback, ["mea_21_xor_dpsk_nojumpback_50ms", "mea_20_xor_dpsk_nojumpback_100ms"], []],
+    "delta_2bit.svg": [plot_delta_2bit, ["mea_24_xor_2bit"], []],
+    "hist_nbit.svg": [plot_hist_nbit, ["mea_24_xor_2bit", "mea_25_xor_4bit", "mea_22_xor_8bit"], []],
+    "hist_4bit_lfsr.svg": [plot_hist_4bit_lfsr, ["mea_27_xor_4bit_lfsr_fix"], []],
+    "hist_4bit_ss.svg": [plot_hist_4bit_ss, ["mea_28_xor_4bit_lfsr_ss"], []],
+    "hist_4bit_ss_despread.svg": [plot_hist_4bit_ss_despread, ["mea_28_xor_4bit_lfsr_ss"], []],
+    "hist_4bit_ecc.svg": [plot_hist_4bit_ecc, ["mea_29_xor_4bit_hamming_50ms"], []],
+    "feld_temp.svg": [plot_feld_temp, ["mea_30_xor_4bit_feld"], [experiments.payloadFields, codec]],
+    "feld_hist.svg": [plot_feld_hist, ["mea_30_xor_4bit_feld"], []],
+    "hochstand_temp.svg": [plot_hochstand_temp, ["mea_31_xor_4bit_hochstand"], [experiments.payloadFields, codec]],
+    "hochstand_hist.svg": [plot_hochstand_hist, ["mea_31_xor_4bit_hochstand"], []],
+    "usts_jitter_abs.svg": [plot_usts_jitter_abs, ["mea_11_jitter"], []],
+    "usts_jitter_ipd.svg": [plot_usts_jitter_ipd, ["mea_11_jitter"], []],
+    "usts_jitter_hist.svg": [plot_usts_jitter_hist, ["mea_11_jitter"], []],
+    "usts_20ms_hist.svg": [plot_usts_20ms_hist, ["mea_13_xor_dpsk_20ms"], []],
+}
+
+HELPERS = [plot_single_hist, plot_single_hist_with_norm, plot_single_ipd, plot_temp_vdd, histogram.compute, histogram.draw, downsample.m4, downsample.plot, experiments.deltaMs, experiments.deltaHistogram]
+
+# Stamps of the rendered figures, next to the figures
+STAMPS_FILE = ".thesisplot.json"
+
+def stamp(filename):
+    # Hash of everything a figure depends on: the plotting code, the settings
+    # of its measurements and their decoded messages (cache key, see cache.py)
+    function, names, code = FIGURES[filename]
+
+    deps = [matplotlib.__version__, WIDTH, HEIGHT]
+    deps += [inspect.getsource(f) for f in [function] + code + HELPERS]
+    for name in names:
+        e = experiments.get(name)
+        del e["path"]
+        deps.append([e, os.path.basename(experiments.cacheKey(name))])
+
+    return hashlib.sha1(json.dumps(deps, default=str).encode()).hexdigest()
+
+def readStamps():
+    try:
+        with open(STAMPS_FILE, "r") as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+def _writeStamps(stamps):
+    with open(STAMPS_FILE + ".tmp", "w") as f:
+        f.write(json.dumps(stamps, indent=1, sort_keys=True))
+    os.replace(STAMPS_FILE + ".tmp", STAMPS_FILE)
+
+def render(filename):
+    # The decode log is already printed by the runner or not wanted
+    with contextlib.redirect_stdout(io.StringIO()):
+        FIGURES[filename][0](filename)
+    return filename
+
+def _initWorker(summaries):
+    # Summaries save the workers the decoding
+    runner._summaries.update(summaries)
+
+def plot(figures=None, force=False, workers=None):
+    # Render all stale figures (or only the given ones) in parallel
+    # Returns the rendered filenames
+    # workers defaults to the number of cores
+    if figures == None:
+        figures = list(FIGURES)
+
+    stamps = readStamps()
+    new = {filename: stamp(filename) for filename in figures}
+    stale = [filename for filename in figures if force or stamps.get(filename) != new[filename] or not os.path.exists(filename)]
+
+    if len(stale) == 0:
+        return []
+
+    if len(stale) == 1 or workers == 1:
+        # Not worth starting workers
+        for filename in stale:
+            render(filename)
+            stamps[filename] = new[filename]
+            _writeStamps(stamps)
+        return stale
+
+    # Decode all measurements in parallel first, the workers then read the
+    # decoded messages from the cache
+    names = []
+    for filename in stale:
+        names += [name for name in FIGURES[filename][1] if not name in names]
+    runner.runMeasurements(names, workers=workers, printLog=False)
+
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(stale)), initializer=_initWorker, initargs=(runner._summaries,)) as pool:
+        futures = [pool.submit(render, filename) for filename in stale]
+
+        for future in as_completed(futures):
+            filename = future.result()
+            stamps[filename] = new[filename]
+            _writeStamps(stamps)
+
+    return stale
+
 
 if __name__ == "__main__":
-    plot()
+    args = sys.argv[1:]
+    force = "-f" in args
+    figures = [a for a in args if a != "-f"]
+
+    for f in figures:
+        if not f in FIGURES:
+            print("Unknown figure: {0}".format(f))
+            print("Use: python3 {0} [-f] [figure ...]".format(sys.argv[0]))
+            print("-f: render even if up to date")
+            exit(1)
+
+    rendered = plot(figures or None, force)
+    print("Rendered: {0}, Up to date: {1}".format(len(rendered), len(figures or FIGURES) - len(rendered)))
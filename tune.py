@@ -0,0 +1,136 @@
+import sys
+import numpy as np
+
+import sweep
+
+# Decoder calibration
+# Finds nominal, tolerance and phaseDelta with the most correctly decoded
+# watermark bits per hour (goodput). A coarse grid around the guessed nominal
+# finds the right basin, the grid is then narrowed around the best point
+# until its steps are down to the resolution. Many points decode equally
+# well, the center of that plateau is returned as it is the most robust
+# choice, together with how far the parameters may be off (margins) and how
+# clearly the best basin wins (ambiguity).
+
+# Parameters are searched down to RESOLUTION [s]
+RESOLUTION = 0.001
+# Grid points per axis and level
+POINTS = 21
+# Parameters within MARGIN of the best goodput count for the margins
+MARGIN = 0.05
+
+def _plateau(goodput, i, level):
+    # Contiguous run around index i with goodput >= level
+    lo = i
+    while lo > 0 and goodput[lo-1] >= level:
+        lo -= 1
+    hi = i
+    while hi < len(goodput) - 1 and goodput[hi+1] >= level:
+        hi += 1
+    return [lo, hi]
+
+def _center(values, goodput, i):
+    # Middle of the plateau of the best goodput around i
+    lo, hi = _plateau(goodput, i, goodput[i])
+    return (values[lo] + values[hi]) / 2
+
+def _margin(values, goodput, center):
+    # [lowest, highest] offset from center keeping MARGIN of the goodput
+    i = int(np.argmin(np.abs(values - center)))
+    lo, hi = _plateau(goodput, i, goodput[i] * (1 - MARGIN))
+    return [values[lo] - center, values[hi] - center]
+
+def tune(name, nominal=None, nominalSpan=0.5, phaseDeltas=None, resolution=RESOLUTION, **settings):
+    # nominal is the guessed interval (default from experiments.py), the
+    # nominal is searched in nominal +- nominalSpan, the tolerance up to
+    # phaseDelta/2, phaseDelta in phaseDeltas (default from experiments.py)
+    prep = sweep.prepare(name, **settings)
+    e = prep["e"]
+
+    if nominal == None:
+        nominal = e["nominal"]
+    if phaseDeltas == None:
+        phaseDeltas = [e["phaseDelta"]]
+    phaseDeltas = np.asarray(phaseDeltas, float)
+
+    # Coarse grid: steps of at most a quarter phaseDelta, so no symbol window
+    # is stepped over
+    numNominals = max(POINTS, int(np.ceil(2 * nominalSpan / (phaseDeltas.min() / 4))) + 1)
+    nominals = nominal + np.linspace(-nominalSpan, nominalSpan, numNominals)
+    tolerances = np.linspace(resolution, phaseDeltas.max() / 2, POINTS)
+
+    coarse = sweep.grid(prep, nominals, tolerances, phaseDeltas)
+    goodput = np.where(tolerances[None, :, None] <= phaseDeltas[None, None, :] / 2, coarse["bitsPerHour"], -1)
+    n, t, p = np.unravel_index(np.argmax(goodput), goodput.shape)
+    bestNominal, bestTolerance, phaseDelta = nominals[n], tolerances[t], phaseDeltas[p]
+
+    # Basins are a phaseDelta apart, the best point of any other basin tells
+    # how clear the choice is
+    other = np.abs(nominals - bestNominal) >= phaseDelta
+    runnerUp = goodput[other].max() if np.any(other) else 0
+
+    # Narrow the grid around the best point
+    nominalStep = nominals[1] - nominals[0]
+    toleranceStep = tolerances[1] - tolerances[0]
+    while nominalStep > resolution or toleranceStep > resolution:
+        nominalStep = max(nominalStep * 4 / (POINTS - 1), resolution)
+        toleranceStep = max(toleranceStep * 4 / (POINTS - 1), resolution)
+        nominals = bestNominal + nominalStep * np.arange(-(POINTS // 2), POINTS // 2 + 1)
+        tolerances = bestTolerance + toleranceStep * np.arange(-(POINTS // 2), POINTS // 2 + 1)
+        tolerances = tolerances[(tolerances >= resolution) & (tolerances <= phaseDelta / 2)]
+
+        res = sweep.grid(prep, nominals, tolerances, [phaseDelta])
+        n, t, p = np.unravel_index(np.argmax(res["bitsPerHour"]), res["bitsPerHour"].shape)
+        bestNominal, bestTolerance = nominals[n], tolerances[t]
+
+    # Center of the plateau, one parameter at a time at the resolution
+    nominals = bestNominal + resolution * np.arange(-np.ceil(phaseDelta / resolution), np.ceil(phaseDelta / resolution) + 1)
+    res = sweep.score(prep, nominals, bestTolerance, phaseDelta)
+    bestNominal = _center(nominals, res["bitsPerHour"], int(np.argmax(res["bitsPerHour"])))
+
+    tolerances = resolution * np.arange(1, np.floor(phaseDelta / 2 / resolution) + 1)
+    res = sweep.score(prep, bestNominal, tolerances, phaseDelta)
+    bestTolerance = _center(tolerances, res["bitsPerHour"], int(np.argmax(res["bitsPerHour"])))
+    toleranceMargin = _margin(tolerances, res["bitsPerHour"], bestTolerance)
+
+    res = sweep.score(prep, nominals, bestTolerance, phaseDelta)
+    nominalMargin = _margin(nominals, res["bitsPerHour"], bestNominal)
+
+    best = sweep.score(prep, bestNominal, bestTolerance, phaseDelta)
+    bitsPerHour = float(best["bitsPerHour"])
+
+    return {
+        "nominal": float(bestNominal),
+        "tolerance": float(bestTolerance),
+        "phaseDelta": float(phaseDelta),
+        "bitsPerHour": bitsPerHour,
+        "ber": float(best["ber"]),
+        "numSymbolErrors": int(best["numSymbolErrors"]),
+        "numUndecodable": int(best["numUndecodable"]),
+        "numSymbolsPossible": best["numSymbolsPossible"],
+        # [s] the parameter may be off and still keep 1 - MARGIN of the goodput
+        "nominalMargin": [float(x) for x in nominalMargin],
+        "toleranceMargin": [float(x) for x in toleranceMargin],
+        # Goodput of the best other basin relative to the chosen one, close
+        # to 1 means the choice is not clear
+        "ambiguity": float(runnerUp / bitsPerHour) if bitsPerHour > 0 else None,
+    }
+
+if __name__ == "__main__":
+    if (len(sys.argv) < 2):
+        print("Too less arguments!")
+        print("Use: python3 {0} measurement [nominal]".format(sys.argv[0]))
+        print("nominal: guessed interval [s], default from experiments.py")
+        exit(1)
+
+    nominal = None
+    if len(sys.argv) > 2:
+        nominal = float(sys.argv[2])
+
+    res = tune(sys.argv[1].strip("/"), nominal)
+    print("nominal:    {0:.4f} s ({1:+.3f} / {2:+.3f})".format(res["nominal"], *res["nominalMargin"]))
+    print("tolerance:  {0:.4f} s ({1:+.3f} / {2:+.3f})".format(res["tolerance"], *res["toleranceMargin"]))
+    print("phaseDelta: {0:.3f} s".format(res["phaseDelta"]))
+    print("goodput:    {0:.2f} bit/h, BER {1:.2f} %, {2} of {3} symbols undecodable".format(res["bitsPerHour"], res["ber"], res["numUndecodable"], res["numSymbolsPossible"]))
+    if res["ambiguity"] != None:
+        print("ambiguity:  {0:.2f}".format(res["ambiguity"]))